@@ -1,55 +1,75 @@
-from machine import Pin, WDT
+import machine
+import asyncio
 import time
-import sys
+import boards
+from wdt_supervisor import TaskSupervisor
+import reset_log
 
 # Duration to keep feeding the watchdog (3 minutes = 180 seconds)
 RUN_DURATION = 180
+# The blink task must check in at least this often to keep the board alive
+BLINK_DEADLINE_MS = 2000
 
-def detect_board_and_configure_led():
-    platform = sys.platform
-    if platform == "esp32":
-        print("ESP32 detected")
-        led_pin = Pin(14, Pin.OUT)  # LED on GPIO 14 for ESP32
-    elif platform == "rp2":
-        print("RP2040 detected")
-        led_pin = Pin(3, Pin.OUT)  # LED on GPIO 3 for RP2040
-    else:
-        print("Unsupported board:", platform)
-        led_pin = None
-    return led_pin
+async def blink(led, supervisor, slot):
+    start_time = time.ticks_ms()
+    while True:
+        elapsed = time.ticks_diff(time.ticks_ms(), start_time) / 1000
+        # Check if 3 minutes have passed
+        if elapsed >= RUN_DURATION:
+            break
+        # Report progress so the supervisor keeps feeding the watchdog
+        supervisor.checkin(slot)
+        # Toggle LED to show activity
+        led.value(not led.value())
+        # Print program status
+        print(f"Program running, LED state: {led.value()}, Time elapsed: {elapsed:.1f}s")
+        await asyncio.sleep_ms(500)  # Blink every 0.5 seconds
+    # Stop checking in, the supervisor will starve the watchdog
+    led.value(0)  # Turn off LED
+    print("Stopped checking in. Awaiting reset...")
+
+async def run(led, log):
+    # Initialize Watchdog Timer with a 5-second timeout
+    supervisor = TaskSupervisor(timeout_ms=5000)
+    slot = supervisor.register("blink", BLINK_DEADLINE_MS)
+    if log:
+        def on_starve(stale_slot):
+            # Leave a trace of which task hung before the WDT fires. The
+            # cause stored is the reset that is about to happen (WDT_RESET),
+            # not machine.reset_cause(), which is why the board last booted
+            log.checkpoint = stale_slot
+            log.append(getattr(machine, "WDT_RESET", 0), reset_log.ERR_TASK_STALE)
+        supervisor.on_starve = on_starve
+    feeder = asyncio.create_task(supervisor.run())
+    await blink(led, supervisor, slot)
+    # Nothing left to do but wait (sleeping, not spinning) for the reset
+    await feeder
 
 def main():
     # Print program start message
     print("Program started")
     
     # Detect board and configure LED
-    led = detect_board_and_configure_led()
-    if led is None:
+    board = boards.get_board()
+    if board is None:
         print("Program terminated due to unsupported board")
         return
-    
-    # Initialize Watchdog Timer with a 5-second timeout
-    wdt = WDT(timeout=5000)
-    
-    start_time = time.time()
-    
-    while True:
-        # Check if 3 minutes have passed
-        if time.time() - start_time < RUN_DURATION:
-            # Feed the watchdog to prevent reset
-            wdt.feed()
-            # Toggle LED to show activity
-            led.value(not led.value())
-            # Print program status
-            print(f"Program running, LED state: {led.value()}, Time elapsed: {time.time() - start_time:.1f}s")
-            time.sleep(0.5)  # Blink every 0.5 seconds
-        else:
-            # Stop feeding the watchdog, let it reset the microcontroller
-            led.value(0)  # Turn off LED
-            print("Stopped feeding watchdog. Awaiting reset...")
-            while True:
-                # Infinite loop to prevent further watchdog feeding
-                pass
+    led = board.led
+
+    # Report what happened before the last reset, then log this boot
+    try:
+        log = reset_log.ResetLog(board.eeprom)
+    except Exception as e:
+        print("Reset log not available:", e)
+        log = None
+    if log:
+        last = log.newest()
+        if last:
+            print("Last logged event:", log.describe(last))
+        log.append(machine.reset_cause(), reset_log.EVENT_BOOT)
+
+    asyncio.run(run(led, log))
 
 # Run the main function
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,15 @@
-from machine import Pin, I2C
+from machine import Pin
+import asyncio
 import time
-import sys
-from ssd1306 import SSD1306_I2C
 import gc
+import boards
+import gpio_timing
+import i2c_probe
+import memprof
+import results
 
-def detect_board_and_configure_pins():
-    platform = sys.platform
-    pin_names = ["AP0", "AP1", "AP2", "AP3", "AP4", "AP5", "AP6", "AP7"]
-
-    if platform == "esp32":
-        pin_numbers = [35, 36, 37, 38, 39, 40, 1, 2]
-    elif platform == "rp2":
-        pin_numbers = [10, 11, 12, 13, 14, 15, 18, 19]
-    else:
-        return None
-
-    return [{"name": name, "pin_number": num} for name, num in zip(pin_names, pin_numbers)]
-
-def detect_board_and_configure_i2c():
-    platform = sys.platform
-    if platform == "esp32":
-        try:
-            i2c = I2C(0, sda=Pin(4), scl=Pin(5), freq=400000)
-            return i2c
-        except Exception as e:
-            print("I2C initialization failed:", e)
-    elif platform == "rp2":
-        try:
-            i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=100_000)
-            return i2c
-        except Exception as e:
-            print("I2C initialization failed:", e)
-    else:
-        return None
+# Set to True to also characterise rise/fall latency of every GPIO pair
+GPIO_TIMING_MODE = False
 
 def oled_print_lines(oled, lines, delay=1):
     oled.fill(0)
@@ -41,7 +18,9 @@ def oled_print_lines(oled, lines, delay=1):
     oled.show()
     time.sleep(delay)
 
-def test_gpio_bidirectional(pin_list, oled=None):
+async def gpio_check(pin_list, oled=None, verbose=True):
+    # Shared by test_gpio_bidirectional and the test runner's test_gpio_async;
+    # verbose=False only prints failures
     pin_pairs = [(0, 4), (1, 5), (2, 6), (3, 7)]
     lines = []
     all_ok = True
@@ -54,89 +33,134 @@ def test_gpio_bidirectional(pin_list, oled=None):
             out_pin = Pin(out_info["pin_number"], Pin.OUT)
             in_pin = Pin(in_info["pin_number"], Pin.IN)
             test_title = "{}->{}".format(out_info['name'], in_info['name'])
+            # Result step: output pin index, input pin index, level
+            step = (pin_list.index(out_info) << 8) | (pin_list.index(in_info) << 4)
             for test_value in [0, 1]:
+                t0 = time.ticks_us()
                 out_pin.value(test_value)
-                time.sleep(0.01)
+                await asyncio.sleep_ms(10)
                 read_value = in_pin.value()
+                duration = time.ticks_diff(time.ticks_us(), t0)
                 result = "OK" if read_value == test_value else "FAIL"
                 if result == "FAIL":
                     all_ok = False
                 msg = "{}:{}>{} {}".format(test_title, test_value, read_value, result)
-                print(msg)
+                if not results.record(results.GPIO, step | test_value, test_value, read_value, duration) \
+                        and (verbose or result == "FAIL"):
+                    print(msg)
                 lines.append(msg)
                 if oled:
                     oled_print_lines(oled, lines)
+                memprof.sample()
             out_pin.value(0)
-    final_msg = "HOSTP12 OK!" if all_ok else "HOST P12 FAIL!"
-    print(final_msg)
-    if oled:
-        oled_print_lines(oled, [final_msg])
-    print("GPIO Test Done!")
+    if verbose:
+        final_msg = "HOSTP12 OK!" if all_ok else "HOST P12 FAIL!"
+        print(final_msg)
+        if oled:
+            oled_print_lines(oled, [final_msg])
+        print("GPIO Test Done!")
+    return all_ok
+
+def test_gpio_bidirectional(pin_list, oled=None):
+    return asyncio.run(gpio_check(pin_list, oled))
+
+async def test_gpio_async(board):
+    # Test runner entry point: no OLED, only failures are printed
+    return await gpio_check(board.gpio_pins(), verbose=False)
+
+def show_checked(oled, step):
+    # Result record: the status byte's display-off bit (D6) after each frame
+    t0 = time.ticks_us()
+    oled.show()
+    try:
+        off = oled.status() & 0x40
+    except OSError:
+        # Some modules don't wire up reads; -1 marks the status as unknown
+        off = -1
+    results.record(results.OLED, step, 0, off, time.ticks_diff(time.ticks_us(), t0))
+    return off != 0x40
 
 def test_oled_display(oled):
+    ok = True
     oled.fill(0)
     oled.text("Test OLED", 0, 0)
     oled.text("Top Left", 0, 10)
     oled.text("Bottom", 0, 20)
     oled.text("Right", 80, 10)
-    oled.show()
+    ok &= show_checked(oled, 0)
     time.sleep(2)
     oled.fill(0)
     oled.hline(0, 16, 128, 1)
     oled.vline(64, 0, 32, 1)
     oled.rect(10, 5, 30, 20, 1)
     oled.fill_rect(90, 5, 30, 20, 1)
-    oled.show()
+    ok &= show_checked(oled, 1)
     time.sleep(2)
     oled.fill(0)
     oled.text("Inverted", 0, 0)
     try:
         oled.invert(1)
-        oled.show()
+        ok &= show_checked(oled, 2)
         time.sleep(1)
         oled.invert(0)
-        oled.show()
+        ok &= show_checked(oled, 3)
         time.sleep(1)
     except:
         pass
     oled.fill(0)
-    oled.show()
+    ok &= show_checked(oled, 4)
+    return ok
 
 def main():
     print("Program started")
-    i2c = detect_board_and_configure_i2c()
-    devices = i2c.scan()
+    prof = memprof.Profiler()
+    board = boards.get_board()
+    if board is None:
+        return
+    try:
+        i2c = board.i2c
+    except Exception as e:
+        print("I2C initialization failed:", e)
+        print("I2C not available")
+        return
+    devices = i2c_probe.find_devices(board)
     if devices:
-        print("Found I2C devices at:", [hex(d) for d in devices])
+        print("Found I2C devices at:", [hex(d) for d in sorted(devices)])
     else:
         print("No I2C devices found")
-    time.sleep(2)
-    if i2c is None:
-        print("I2C not available")
-        return
     try:
-        oled = SSD1306_I2C(128, 32, i2c)
+        oled = board.oled
         oled.fill(0)
         oled.text("Program Started", 0, 0)
         oled.show()
-        test_oled_display(oled)
+        with prof.phase("oled"):
+            test_oled_display(oled)
     except Exception as e:
         print("OLED init failed:", e)
         return
 
-    pin_list = detect_board_and_configure_pins()
+    pin_list = board.gpio_pins()
     if pin_list:
         oled.fill(0)
         oled.text("Test GPIO...", 0, 0)
         oled.show()
-        test_gpio_bidirectional(pin_list, oled)
+        with prof.phase("gpio"):
+            test_gpio_bidirectional(pin_list, oled)
         time.sleep(2)
+        if GPIO_TIMING_MODE:
+            oled.fill(0)
+            oled.text("GPIO timing...", 0, 0)
+            oled.show()
+            gpio_timing.save(gpio_timing.characterise_pairs(pin_list))
     else:
         oled.fill(0)
         oled.text("No GPIO test", 0, 0)
         oled.show()
         time.sleep(2)
 
+    prof.report()
+    prof.check()
+
     # start_time = time.time()
     # while True:
     #     elapsed = time.time() - start_time
@@ -148,4 +172,6 @@ def main():
     #     print("Elapsed time: %.1fs, RAM usage: %.1f%%" % (elapsed, ram_usage))
     #     time.sleep(0.5)
 
-main()
+if __name__ == "__main__":
+    main()
+
@@ -1,9 +1,10 @@
-from machine import Pin, I2C
+from machine import Pin
 import time
-import sys
-from ssd1306 import SSD1306_I2C
 import gc
-import tca9534
+import boards
+import i2c_probe
+import memprof
+import results
 
 RELAY0=0
 RELAY1=1
@@ -13,59 +14,16 @@ RELAY3=3
 RELAY_ON = 0
 RELAY_OFF = 1
 
-bitmask = "0x00"  # Default bitmask for all pins
-tca9534_mask = int(bitmask, 16)
+def relay_output(tca, relay_num):
+    # Output register bit actually latched for the relay
+    return (tca.bus.readfrom_mem(tca.address, tca.REGISTER_OUTPUT_PORT, 1)[0] >> relay_num) & 1
 
-def detect_board_and_configure_pins():
-    platform = sys.platform
-    pin_names = ["AP0", "AP1", "AP2", "AP3", "AP4", "AP5", "AP6", "AP7"]
-
-    if platform == "esp32":
-        pin_numbers = [35, 36, 37, 38, 39, 40, 1, 2]
-    elif platform == "rp2":
-        pin_numbers = [10, 11, 12, 13, 14, 15, 18, 19]
-    else:
-        return None
-
-    return [{"name": name, "pin_number": num} for name, num in zip(pin_names, pin_numbers)]
-
-def detect_board_and_configure_i2c():
-    platform = sys.platform
-    global tca9534_mask
-    if platform == "esp32":
-        try:
-            print("ESP32 board detected.")
-            print("Select ESP32 board type:")
-            print("1. NANO (SDA=11, SCL=12, freq=100kHz)")
-            print("2. NON_NANO (SDA=4, SCL=5, freq=100kHz)")
-            while True:
-                choice = input("Enter a number (1-2): ").strip()
-                if choice == "1":
-                    i2c = I2C(0, sda=Pin(11), scl=Pin(12), freq=100000)
-                    dev = tca9534.TCA9534(tca9534_address=0x3f,scl=Pin(12), sda=Pin(11), bitmask=tca9534_mask)  # ESP32-
-                    break
-                elif choice == "2":
-                    i2c = I2C(0, sda=Pin(4), scl=Pin(5), freq=100000)
-                    dev = tca9534.TCA9534(tca9534_address=0x3f,scl=Pin(5), sda=Pin(4), bitmask=tca9534_mask)  # ESP32-
-                    break
-                else:
-                    print("Invalid choice. Try again.")
-            print("I2C initialized successfully.")
-            
-            # dev = None  # Placeholder for TCA9534 initialization
-            return i2c, dev
-        except Exception as e:
-            print("I2C initialization failed:", e)
-    elif platform == "rp2":
-        try:
-            i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=100_000)
-            dev = tca9534.TCA9534(tca9534_address=0x20,scl=Pin(5), sda=Pin(4), bitmask=tca9534_mask)  # ESP32-S3
-
-            return i2c,dev
-        except Exception as e:
-            print("I2C initialization failed:", e)
-    else:
-        return None
+def switch_relay(tca, cycle, relay_num, value):
+    # Result record step: cycle, relay, 1 for the ON write
+    t0 = time.ticks_us()
+    tca.write_pin(relay_num, value)
+    results.record(results.RELAY, (cycle << 4) | (relay_num << 1) | (value == RELAY_ON),
+                   value, relay_output(tca, relay_num), time.ticks_diff(time.ticks_us(), t0))
 
 def oled_print_lines(oled, lines, delay=1):
     oled.fill(0)
@@ -106,41 +64,65 @@ def test_gpio_bidirectional(pin_list, oled=None):
         oled_print_lines(oled, [final_msg])
     print("GPIO Test Done!")
 
+def show_checked(oled, step):
+    # Result record: the status byte's display-off bit (D6) after each frame
+    t0 = time.ticks_us()
+    oled.show()
+    try:
+        off = oled.status() & 0x40
+    except OSError:
+        # Some modules don't wire up reads; -1 marks the status as unknown
+        off = -1
+    results.record(results.OLED, step, 0, off, time.ticks_diff(time.ticks_us(), t0))
+    return off != 0x40
+
 def test_oled_display(oled):
+    ok = True
     oled.fill(0)
     oled.text("Test OLED", 0, 0)
     oled.text("Top Left", 0, 10)
     oled.text("Bottom", 0, 20)
     oled.text("Right", 80, 10)
-    oled.show()
+    ok &= show_checked(oled, 0)
     time.sleep(2)
     oled.fill(0)
     oled.hline(0, 16, 128, 1)
     oled.vline(64, 0, 32, 1)
     oled.rect(10, 5, 30, 20, 1)
     oled.fill_rect(90, 5, 30, 20, 1)
-    oled.show()
+    ok &= show_checked(oled, 1)
     time.sleep(2)
     oled.fill(0)
     oled.text("Inverted", 0, 0)
     try:
         oled.invert(1)
-        oled.show()
+        ok &= show_checked(oled, 2)
         time.sleep(1)
         oled.invert(0)
-        oled.show()
+        ok &= show_checked(oled, 3)
         time.sleep(1)
     except:
         pass
     oled.fill(0)
-    oled.show()
+    ok &= show_checked(oled, 4)
+    return ok
 
 def main():
     print("Program started")
-    i2c,tca = detect_board_and_configure_i2c()
-    devices = i2c.scan()
+    prof = memprof.Profiler()
+    board = boards.get_board()
+    if board is None:
+        return
+    try:
+        i2c = board.i2c
+        tca = board.tca
+    except Exception as e:
+        print("I2C initialization failed:", e)
+        print("I2C not available")
+        return
+    devices = i2c_probe.find_devices(board)
     if devices:
-        print("Found I2C devices at:", [hex(d) for d in devices])
+        print("Found I2C devices at:", [hex(d) for d in sorted(devices)])
     else:
         print("No I2C devices found")
 
@@ -148,29 +130,35 @@ def main():
     tca.write_pin(RELAY1, RELAY_OFF)
     tca.write_pin(RELAY2, RELAY_OFF)
     tca.write_pin(RELAY3, RELAY_OFF)
-    if i2c is None:
-        print("I2C not available")
-        return
     try:
-        oled = SSD1306_I2C(128, 32, i2c)
+        oled = board.oled
         oled.fill(0)
         oled.text("Program Started", 0, 0)
         oled.show()
-        test_oled_display(oled)
+        with prof.phase("oled"):
+            test_oled_display(oled)
     except Exception as e:
         print("OLED init failed:", e)
         return
 
-    for i in range(10):  # Lặp 10 lần, bạn có thể thay đổi số lần lặp nếu muốn
-        for relay_num in [RELAY0, RELAY1, RELAY2, RELAY3]:
-            tca.write_pin(relay_num, RELAY_ON)
-            oled.fill(0)
-            oled.text(f"Relay {relay_num+1} ON", 0, 0)
-            oled.show()
-            time.sleep(2)
-            tca.write_pin(relay_num, RELAY_OFF)
-            oled.fill(0)
-            oled.text(f"Relay {relay_num+1} OFF", 0, 0)
-            oled.show()
-            time.sleep(2)
-main()
+    with prof.phase("relay"):
+        for i in range(10):  # Lặp 10 lần, bạn có thể thay đổi số lần lặp nếu muốn
+            for relay_num in [RELAY0, RELAY1, RELAY2, RELAY3]:
+                switch_relay(tca, i, relay_num, RELAY_ON)
+                oled.fill(0)
+                oled.text(f"Relay {relay_num+1} ON", 0, 0)
+                oled.show()
+                time.sleep(2)
+                switch_relay(tca, i, relay_num, RELAY_OFF)
+                oled.fill(0)
+                oled.text(f"Relay {relay_num+1} OFF", 0, 0)
+                oled.show()
+                time.sleep(2)
+                memprof.sample()
+
+    prof.report()
+    prof.check()
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,230 @@
+"""Driver micro-benchmarks with per-transaction accounting.
+
+Times SSD1306, TCA9534, EEPROM and UART operations on the current board
+and records, per operation: wall time (ticks_us), I2C transactions and
+bytes on the wire (through CountingI2C) and heap allocated (gc.mem_alloc
+delta). Results are written to BENCH_FILE as JSON so runs can be compared
+across firmware versions and boards with compare().
+"""
+import gc
+import json
+import os
+import sys
+import time
+import machine
+import boards
+import RS485Test
+
+BENCH_FILE = "bench_results.json"
+
+# Same sweep as the UART test
+UART_BAUDRATES = RS485Test.BAUDRATES
+
+
+class CountingI2C:
+    """I2C proxy that counts transactions and bytes on the wire.
+
+    Bytes include the address byte of every transfer (and the repeated one
+    of a combined read), not just the payload.
+    """
+
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes = 0
+
+    def writeto(self, addr, buf, stop=True):
+        self.transactions += 1
+        self.bytes += 1 + len(buf)
+        return self.i2c.writeto(addr, buf, stop)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        self.transactions += 1
+        self.bytes += 1 + nbytes
+        return self.i2c.readfrom(addr, nbytes, stop)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self.transactions += 1
+        self.bytes += 1 + len(buf)
+        return self.i2c.readfrom_into(addr, buf, stop)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        self.transactions += 1
+        self.bytes += 1 + addrsize // 8 + len(buf)
+        return self.i2c.writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        self.transactions += 1
+        self.bytes += 2 + addrsize // 8 + nbytes
+        return self.i2c.readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        self.transactions += 1
+        self.bytes += 2 + addrsize // 8 + len(buf)
+        return self.i2c.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+
+    def scan(self):
+        found = self.i2c.scan()
+        self.transactions += 0x78 - 0x08
+        self.bytes += 0x78 - 0x08
+        return found
+
+    def __getattr__(self, name):
+        return getattr(self.i2c, name)
+
+
+def bench(name, fn, reps=10, bus=None, uart_bytes=0):
+    """Run fn() reps times and return one result record."""
+    if bus:
+        bus.reset()
+    gc.collect()
+    alloc0 = gc.mem_alloc()
+    t0 = time.ticks_us()
+    for i in range(reps):
+        fn(i)
+    elapsed = time.ticks_diff(time.ticks_us(), t0)
+    # A collection during the run makes the delta meaningless (negative)
+    alloc = gc.mem_alloc() - alloc0
+    result = {
+        "name": name,
+        "reps": reps,
+        "us_per_op": elapsed // reps,
+        "i2c_transactions": bus.transactions / reps if bus else 0,
+        "i2c_bytes": bus.bytes / reps if bus else 0,
+        "uart_bytes": uart_bytes,
+        "alloc_bytes": alloc // reps if alloc >= 0 else None,
+    }
+    print("{:<28} {:>9}us {:>6} txn {:>7} B {:>7} alloc".format(
+        name, result["us_per_op"], result["i2c_transactions"],
+        result["i2c_bytes"] or uart_bytes, result["alloc_bytes"]))
+    return result
+
+
+def bench_oled(board, bus):
+    oled = board.oled
+    # Count through bus, putting the shared peripheral's own bus back after
+    oled.i2c, i2c = bus, oled.i2c
+    try:
+        return [
+            bench("ssd1306.fill", lambda i: oled.fill(i & 1), 20, bus),
+            bench("ssd1306.text", lambda i: oled.text("Benchmark", 0, 0), 20, bus),
+            bench("ssd1306.show", lambda i: oled.show(), 10, bus),
+        ]
+    finally:
+        oled.i2c = i2c
+
+
+def bench_tca(board):
+    tca = board.tca
+    # The expander may sit on its own bus (rp2), so wrap whichever it uses
+    bus = CountingI2C(tca.bus)
+    tca.bus = bus
+    try:
+        return [
+            bench("tca9534.write_pin", lambda i: tca.write_pin(0, i & 1), 20, bus),
+            bench("tca9534.read_pin", lambda i: tca.read_pin(4), 20, bus),
+        ]
+    finally:
+        tca.bus = bus.i2c
+
+
+def bench_eeprom(board, bus, sizes=(1, 16, 64)):
+    eeprom = board.eeprom
+    # Count through bus and keep the per-byte trace out of the timed loops
+    eeprom.i2c, i2c = bus, eeprom.i2c
+    eeprom.trace, trace = False, eeprom.trace
+    start = eeprom.size // 2
+    results = []
+    try:
+        for size in sizes:
+            data = bytes([i % 256 for i in range(size)])
+            results.append(bench("eeprom.write_array[{}]".format(size),
+                                 lambda i: eeprom.write_array(start, data), 2, bus))
+            results.append(bench("eeprom.read_array[{}]".format(size),
+                                 lambda i: eeprom.read_array(start, size), 2, bus))
+        page = bytes(range(eeprom.page_size))
+        results.append(bench("eeprom.write_page[{}]".format(eeprom.page_size),
+                             lambda i: eeprom.write_page(start, page), 5, bus))
+        results.append(bench("eeprom.read_block[{}]".format(eeprom.page_size),
+                             lambda i: eeprom.read_block(start, eeprom.page_size), 5, bus))
+    finally:
+        eeprom.i2c = i2c
+        eeprom.trace = trace
+    return results
+
+
+def bench_uart(board, baudrates=UART_BAUDRATES):
+    message = b"0123456789abcdef\n"
+    results = []
+    for baudrate in baudrates:
+        port_test, rs485_port = board.uart_pair(baudrate)
+
+        def round_trip(i):
+            while rs485_port.any():
+                rs485_port.read()
+            port_test.write(message)
+            rs485_port.write(rs485_port.readline() or b"")
+            port_test.readline()
+
+        results.append(bench("uart.round_trip[{}]".format(baudrate), round_trip, 5,
+                             uart_bytes=2 * len(message)))
+    return results
+
+
+def metadata(board):
+    meta = {
+        "platform": board.platform,
+        "variant": board.variant,
+        "cpu_freq": machine.freq(),
+        "implementation": sys.implementation.name,
+        "version": ".".join(str(v) for v in sys.implementation.version[:3]),
+    }
+    try:
+        meta["release"] = os.uname().release
+        meta["machine"] = os.uname().machine
+    except AttributeError:
+        pass
+    return meta
+
+
+def run(path=BENCH_FILE, oled=True, tca=True, eeprom=True, uart=True):
+    board = boards.get_board()
+    if board is None:
+        return None
+    results = []
+    if oled:
+        results += bench_oled(board, CountingI2C(board.i2c))
+    if tca:
+        results += bench_tca(board)
+    if eeprom:
+        results += bench_eeprom(board, CountingI2C(board.eeprom_i2c))
+    if uart:
+        results += bench_uart(board)
+    report = {"meta": metadata(board), "results": results}
+    with open(path, "w") as f:
+        json.dump(report, f)
+    print("Results written to", path)
+    return report
+
+
+def compare(old_path, new_path):
+    """Print the per-operation change between two result files."""
+    with open(old_path) as f:
+        old = {r["name"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    for r in new:
+        before = old.get(r["name"])
+        if not before or not before["us_per_op"]:
+            print("{:<28} {:>9}us (new)".format(r["name"], r["us_per_op"]))
+            continue
+        print("{:<28} {:>9}us -> {:>9}us ({:+.1f}%)".format(
+            r["name"], before["us_per_op"], r["us_per_op"],
+            (r["us_per_op"] - before["us_per_op"]) * 100 / before["us_per_op"]))
+
+
+if __name__ == "__main__":
+    run()
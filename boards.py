@@ -0,0 +1,196 @@
+"""Board profiles shared by all HOSTP12 test scripts.
+
+One table describes every supported board (pins, bus frequencies, expander
+addresses and UART mappings), keyed by sys.platform and board variant. The
+chosen variant is saved to VARIANT_FILE so only the very first run on a
+board asks for it. Peripherals are created lazily the first time a test
+touches them, so scripts never initialise buses they don't use.
+"""
+import sys
+from machine import Pin, I2C, UART
+
+VARIANT_FILE = "board_variant.txt"
+
+PIN_NAMES = ["AP0", "AP1", "AP2", "AP3", "AP4", "AP5", "AP6", "AP7"]
+
+_ESP32_GPIO = [35, 36, 37, 38, 39, 40, 1, 2]
+
+PROFILES = {
+    ("esp32", "NANO"): {
+        "led": 14,
+        "gpio": _ESP32_GPIO,
+        "i2c": {"id": 0, "sda": 11, "scl": 12, "freq": 400_000},
+        "eeprom_i2c": {"id": 0, "sda": 11, "scl": 12, "freq": 400_000},
+        "oled_address": 0x3C,
+        "tca9534": {"id": 0, "address": 0x3f, "sda": 11, "scl": 12, "freq": 400_000},
+        "eeprom": "AT24C64",
+        "uart_test": {"id": 1, "tx": 1, "rx": 5},
+        "uart_rs485": {"id": 2, "tx": 7, "rx": 8},
+    },
+    ("esp32", "NON_NANO"): {
+        "led": 14,
+        "gpio": _ESP32_GPIO,
+        "i2c": {"id": 0, "sda": 4, "scl": 5, "freq": 400_000},
+        "eeprom_i2c": {"id": 0, "sda": 4, "scl": 5, "freq": 400_000},
+        "oled_address": 0x3C,
+        "tca9534": {"id": 0, "address": 0x3f, "sda": 4, "scl": 5, "freq": 400_000},
+        "eeprom": "AT24C64",
+        "uart_test": {"id": 1, "tx": 7, "rx": 6},
+        "uart_rs485": {"id": 2, "tx": 33, "rx": 34},
+    },
+    ("rp2", "DEFAULT"): {
+        "led": 3,
+        "gpio": [10, 11, 12, 13, 14, 15, 18, 19],
+        "i2c": {"id": 0, "sda": 0, "scl": 1, "freq": 100_000},
+        "eeprom_i2c": {"id": 0, "sda": 20, "scl": 21, "freq": 400_000},
+        "oled_address": 0x3C,
+        "tca9534": {"id": 0, "address": 0x20, "sda": 4, "scl": 5, "freq": 400_000},
+        "eeprom": "AT24C64",
+        "uart_test": {"id": 0, "tx": 0, "rx": 1},
+        "uart_rs485": {"id": 1, "tx": 8, "rx": 9},
+    },
+}
+
+_board = None
+
+
+def variants(platform=None):
+    platform = platform or sys.platform
+    return [variant for (plat, variant) in PROFILES if plat == platform]
+
+
+def save_variant(variant):
+    with open(VARIANT_FILE, "w") as f:
+        f.write(variant)
+
+
+def saved_variant(platform=None):
+    """Return the variant without asking: the only one, the saved one or None."""
+    choices = variants(platform)
+    if len(choices) == 1:
+        return choices[0]
+    try:
+        with open(VARIANT_FILE) as f:
+            variant = f.read().strip()
+        if variant in choices:
+            return variant
+    except OSError:
+        pass
+    return None
+
+
+def load_variant(platform=None):
+    """Return the saved variant, asking once (and saving it) if needed."""
+    choices = variants(platform)
+    if not choices:
+        return None
+    variant = saved_variant(platform)
+    if variant:
+        return variant
+    print("Select {} board type:".format(platform or sys.platform))
+    for i, name in enumerate(choices):
+        print("{}. {}".format(i + 1, name))
+    while True:
+        choice = input("Enter a number (1-{}): ".format(len(choices))).strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(choices):
+            variant = choices[int(choice) - 1]
+            save_variant(variant)
+            return variant
+        print("Invalid choice. Try again.")
+
+
+def _make_i2c(cfg):
+    return I2C(cfg["id"], sda=Pin(cfg["sda"]), scl=Pin(cfg["scl"]), freq=cfg["freq"])
+
+
+class Board:
+    """A board profile whose peripherals are built on first use."""
+
+    def __init__(self, platform, variant):
+        self.platform = platform
+        self.variant = variant
+        self.profile = PROFILES[(platform, variant)]
+        self._led = None
+        self._i2c = None
+        self._eeprom_i2c = None
+        self._oled = None
+        self._tca = None
+        self._eeprom = None
+
+    def gpio_pins(self):
+        return [{"name": name, "pin_number": num}
+                for name, num in zip(PIN_NAMES, self.profile["gpio"])]
+
+    @property
+    def led(self):
+        if self._led is None:
+            self._led = Pin(self.profile["led"], Pin.OUT)
+        return self._led
+
+    @property
+    def i2c(self):
+        if self._i2c is None:
+            self._i2c = _make_i2c(self.profile["i2c"])
+        return self._i2c
+
+    @property
+    def eeprom_i2c(self):
+        if self._eeprom_i2c is None:
+            cfg = self.profile["eeprom_i2c"]
+            if cfg == self.profile["i2c"]:
+                self._eeprom_i2c = self.i2c
+            else:
+                self._eeprom_i2c = _make_i2c(cfg)
+        return self._eeprom_i2c
+
+    @property
+    def oled(self):
+        if self._oled is None:
+            from ssd1306 import SSD1306_I2C
+            self._oled = SSD1306_I2C(128, 32, self.i2c, addr=self.profile["oled_address"])
+        return self._oled
+
+    @property
+    def tca(self):
+        if self._tca is None:
+            import tca9534
+            cfg = self.profile["tca9534"]
+            bus_cfg = self.profile["i2c"]
+            if cfg["sda"] == bus_cfg["sda"] and cfg["scl"] == bus_cfg["scl"]:
+                self._tca = tca9534.TCA9534(tca9534_address=cfg["address"], i2c=self.i2c)
+            else:
+                # The expander has its own pins, id and freq (rp2)
+                self._tca = tca9534.TCA9534(i2c_ch=cfg["id"], tca9534_address=cfg["address"],
+                                            scl=Pin(cfg["scl"]), sda=Pin(cfg["sda"]),
+                                            freq=cfg["freq"])
+        return self._tca
+
+    @property
+    def eeprom(self):
+        if self._eeprom is None:
+            import testEEPROM
+            self._eeprom = getattr(testEEPROM, self.profile["eeprom"])(self.eeprom_i2c)
+        return self._eeprom
+
+    def uart_pair(self, baudrate):
+        """Return (port_test, rs485_port) configured for baudrate."""
+        ports = []
+        for key in ("uart_test", "uart_rs485"):
+            cfg = self.profile[key]
+            ports.append(UART(cfg["id"], baudrate=baudrate, tx=Pin(cfg["tx"]),
+                              rx=Pin(cfg["rx"]), rxbuf=1024, timeout=500))
+        return ports[0], ports[1]
+
+
+def get_board():
+    """Return the Board for this platform, or None if it is unsupported."""
+    global _board
+    if _board is None:
+        platform = sys.platform
+        variant = load_variant(platform)
+        if variant is None:
+            print("Unsupported board:", platform)
+            return None
+        print("{} {} board".format(platform, variant))
+        _board = Board(platform, variant)
+    return _board
@@ -0,0 +1,166 @@
+"""GPIO propagation-delay and edge-timing characterisation.
+
+Toggles the output side of each loopback pair and timestamps the matching
+input edge from a Pin.irq handler with time.ticks_us, collecting rise and
+fall latency histograms over many repetitions. The latency includes the
+IRQ entry time of the port, so compare pairs against each other (or
+against a known-good fixture) rather than reading it as pure wire delay.
+"""
+from machine import Pin
+from array import array
+import time
+import gc
+import json
+import results
+
+# Same pairing as test_gpio_bidirectional: APn <-> APn+4
+PIN_PAIRS = [(0, 4), (1, 5), (2, 6), (3, 7)]
+
+# Histogram bucket upper bounds in microseconds, the last bucket takes the rest
+BUCKETS_US = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+TIMING_FILE = "gpio_timing.json"
+
+EDGE_TIMEOUT_US = 10000
+SETTLE_US = 200
+
+
+class EdgeStats:
+    """Latency histogram for one edge direction of one pin pair."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_US) + 1)
+        self.n = 0
+        self.timeouts = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, latency_us):
+        if latency_us is None:
+            self.timeouts += 1
+            return
+        i = 0
+        for bound in BUCKETS_US:
+            if latency_us <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.n += 1
+        self.total += latency_us
+        if self.min is None or latency_us < self.min:
+            self.min = latency_us
+        if self.max is None or latency_us > self.max:
+            self.max = latency_us
+
+    def mean(self):
+        return self.total // self.n if self.n else None
+
+    def as_dict(self):
+        return {"n": self.n, "timeouts": self.timeouts, "min": self.min,
+                "mean": self.mean(), "max": self.max, "buckets_us": BUCKETS_US,
+                "counts": self.counts}
+
+    def summary(self):
+        return "n={} min={} mean={} max={} to={}".format(
+            self.n, self.min, self.mean(), self.max, self.timeouts)
+
+    def histogram(self):
+        # Non-empty buckets as "<=bound:count", the overflow bucket as ">last"
+        parts = []
+        for i, count in enumerate(self.counts):
+            if count:
+                if i < len(BUCKETS_US):
+                    parts.append("<={}:{}".format(BUCKETS_US[i], count))
+                else:
+                    parts.append(">{}:{}".format(BUCKETS_US[-1], count))
+        return " ".join(parts) or "-"
+
+
+def _attach_irq(pin, handler):
+    trigger = Pin.IRQ_RISING | Pin.IRQ_FALLING
+    try:
+        # Hard IRQs keep the scheduler out of the measured latency
+        pin.irq(handler, trigger, hard=True)
+    except (TypeError, ValueError):
+        pin.irq(handler, trigger)
+
+
+def _wait_edge(stamp, t0, timeout_us):
+    while not stamp[1]:
+        if time.ticks_diff(time.ticks_us(), t0) > timeout_us:
+            return None
+    return time.ticks_diff(stamp[0], t0)
+
+
+def measure_pair(out_number, in_number, reps=200, timeout_us=EDGE_TIMEOUT_US):
+    """Return (rise, fall) EdgeStats for out_number driving in_number."""
+    out_pin = Pin(out_number, Pin.OUT, value=0)
+    in_pin = Pin(in_number, Pin.IN)
+    rise = EdgeStats()
+    fall = EdgeStats()
+    # stamp[0] = edge time, stamp[1] = edge seen; preallocated so the
+    # handler never touches the heap
+    stamp = array('i', [0, 0])
+
+    def on_edge(pin):
+        stamp[0] = time.ticks_us()
+        stamp[1] = 1
+
+    time.sleep_us(SETTLE_US)
+    _attach_irq(in_pin, on_edge)
+    gc.collect()
+    try:
+        for _ in range(reps):
+            for level, stats in ((1, rise), (0, fall)):
+                stamp[1] = 0
+                t0 = time.ticks_us()
+                out_pin.value(level)
+                stats.add(_wait_edge(stamp, t0, timeout_us))
+                time.sleep_us(SETTLE_US)
+    finally:
+        in_pin.irq(None)
+        out_pin.value(0)
+    return rise, fall
+
+
+def characterise_pairs(pin_list, pairs=PIN_PAIRS, reps=200, max_latency_us=None):
+    """Measure every pair in both directions.
+
+    Returns a dict keyed by "APx->APy" with "rise"/"fall" histograms and a
+    "marginal" flag set when an edge timed out or exceeded max_latency_us.
+    """
+    report = {}
+    for idx1, idx2 in pairs:
+        for out_idx, in_idx in ((idx1, idx2), (idx2, idx1)):
+            out_info = pin_list[out_idx]
+            in_info = pin_list[in_idx]
+            title = "{}->{}".format(out_info['name'], in_info['name'])
+            rise, fall = measure_pair(out_info["pin_number"], in_info["pin_number"], reps)
+            marginal = bool(rise.timeouts or fall.timeouts)
+            if max_latency_us is not None:
+                for stats in (rise, fall):
+                    if stats.max is not None and stats.max > max_latency_us:
+                        marginal = True
+            # Result record per edge: timeouts (expected 0), worst latency,
+            # flags 1 if the pair is marginal
+            recorded = False
+            for edge, stats in enumerate((rise, fall)):
+                recorded = results.record(results.GPIO_TIMING, (out_idx << 8) | (in_idx << 4) | edge,
+                                          0, stats.timeouts, stats.max or 0, int(marginal))
+            if not recorded:
+                print("{} rise {}".format(title, rise.summary()))
+                print("{} rise us {}".format(title, rise.histogram()))
+                print("{} fall {}".format(title, fall.summary()))
+                print("{} fall us {}".format(title, fall.histogram()))
+                if marginal:
+                    print("{} MARGINAL".format(title))
+            report[title] = {"rise": rise.as_dict(), "fall": fall.as_dict(),
+                             "marginal": marginal}
+    return report
+
+def save(report, path=TIMING_FILE):
+    """Write the characterise_pairs() report, histograms included, as JSON."""
+    with open(path, "w") as f:
+        json.dump(report, f)
+    print("GPIO timing saved to", path)
@@ -0,0 +1,52 @@
+"""Decode the binary result stream from results.py into CSV or JSON.
+
+    python3 host/decode_results.py capture.bin --format csv > results.csv
+    python3 host/decode_results.py - --format json < capture.bin
+
+Input is a raw capture of the USB REPL or the result UART; ordinary text
+printed between records is written to stderr with --text.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import results
+
+FIELDS = ["test", "test_id", "step", "expected", "observed", "duration_us", "flags", "passed"]
+
+
+def write_csv(records, out):
+    writer = csv.DictWriter(out, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="captured stream, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--text", action="store_true", help="echo non-record text to stderr")
+    args = parser.parse_args(argv)
+
+    if args.capture == "-":
+        data = sys.stdin.buffer.read()
+    else:
+        with open(args.capture, "rb") as f:
+            data = f.read()
+    records, text = results.decode(data)
+    if args.text and text:
+        sys.stderr.write(text.decode(errors="replace"))
+    if args.format == "csv":
+        write_csv(records, sys.stdout)
+    else:
+        json.dump(records, sys.stdout, indent=2)
+        print()
+    return 0 if all(r["passed"] for r in records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
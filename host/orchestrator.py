@@ -0,0 +1,237 @@
+"""Validate many HOSTP12 boards in parallel over their serial ports.
+
+For each port a worker enters the raw REPL, pushes the driver and test
+modules whose sha256 differs from the copy on the board, soft-resets,
+runs runner.main() while streaming its output, and records pass/fail and
+timings. The summary reports per-board results and throughput in boards
+per hour. A board whose variant can't be determined without the prompt
+fails straight away; --variant writes board_variant.txt for it.
+
+    python3 host/orchestrator.py /dev/ttyACM0 /dev/ttyACM1 --json results.json
+    python3 host/orchestrator.py /dev/ttyUSB0 /dev/ttyUSB1 --variant /dev/ttyUSB1=NANO
+
+sim/fakeboard.py provides pseudo-terminal boards running the simulated
+hardware for trying this without any hardware.
+"""
+import argparse
+import ast
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+from rawrepl import RawRepl, RawReplError
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import results
+
+# Everything runner.py imports on the board
+DEVICE_FILES = [
+    "boards.py",
+    "ssd1306.py",
+    "tca9534.py",
+    "testEEPROM.py",
+    "HOSTP12.py",
+    "RS485Test.py",
+    "gpio_timing.py",
+    "i2c_probe.py",
+    "memprof.py",
+    "results.py",
+    "runner.py",
+]
+
+# boards.VARIANT_FILE; pushed when --variant is given so nothing prompts
+VARIANT_FILE = "board_variant.txt"
+
+VARIANT_CODE = "import boards\nprint('VARIANT', boards.saved_variant())\n"
+
+RUN_CODE = "import runner\nprint('RUNNER_RESULT', runner.main({}))\n"
+
+_print_lock = threading.Lock()
+
+
+def log(port, text):
+    with _print_lock:
+        for line in text.splitlines():
+            print("[{}] {}".format(port, line))
+        sys.stdout.flush()
+
+
+def load_files(names, repo_dir=REPO_DIR):
+    files = {}
+    for name in names:
+        with open(os.path.join(repo_dir, name), "rb") as f:
+            data = f.read()
+        files[name] = (data, hashlib.sha256(data).hexdigest())
+    return files
+
+
+def runner_constants(repo_dir=REPO_DIR):
+    """Read MANIFEST test names and STATUSES from runner.py without importing it."""
+    with open(os.path.join(repo_dir, "runner.py")) as f:
+        tree = ast.parse(f.read())
+    values = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            values[node.targets[0].id] = node.value
+    names = [ast.literal_eval(entry.elts[0]) for entry in values["MANIFEST"].elts]
+    return names, ast.literal_eval(values["STATUSES"])
+
+
+class LineStream:
+    """Feeds streamed REPL output to log() a line at a time."""
+
+    def __init__(self, port, quiet=False):
+        self.port = port
+        self.quiet = quiet
+        self.pending = b""
+        self.raw = b""
+        self.lines = []
+
+    def __call__(self, chunk):
+        self.raw += chunk
+        self.pending += chunk
+        *complete, self.pending = self.pending.split(b"\n")
+        for raw in complete:
+            # Result frames never contain a newline, so they can be cut out per line
+            raw = results.decode(raw)[1]
+            line = raw.decode(errors="replace").rstrip("\r")
+            self.lines.append(line)
+            if not self.quiet:
+                log(self.port, line)
+
+    def flush(self):
+        if self.pending:
+            self.pending += b"\n"
+            self(b"")
+
+
+def parse_variants(values):
+    """Turn --variant [PORT=]VARIANT options into {port or None: variant}."""
+    variants = {}
+    for value in values or []:
+        port, _, variant = value.rpartition("=")
+        variants[port or None] = variant
+    return variants
+
+
+def validate_board(port, files, baudrate=115200, timeout=300, quiet=False, binary=False,
+                   variant=None):
+    result = {"port": port, "passed": False, "pushed": [], "tests": {}, "error": None}
+    t0 = time.monotonic()
+    repl = None
+    if variant:
+        data = variant.encode()
+        files = dict(files)
+        files[VARIANT_FILE] = (data, hashlib.sha256(data).hexdigest())
+    try:
+        repl = RawRepl(port, baudrate)
+        repl.enter()
+        hashes = repl.file_hashes(files)
+        for name, (data, digest) in files.items():
+            if hashes.get(name) != digest:
+                repl.put_file(name, data)
+                result["pushed"].append(name)
+        # runner.main() would block on the variant prompt until the timeout
+        out = repl.exec_(VARIANT_CODE).decode().split()
+        if out[-1:] == ["None"]:
+            raise RawReplError("{}: board variant unknown, pass --variant".format(port))
+        result["variant"] = out[-1]
+        # Forget modules imported before the push
+        repl.soft_reset()
+        result["sync_s"] = round(time.monotonic() - t0, 3)
+        t1 = time.monotonic()
+        stream = LineStream(port, quiet)
+        repl.exec_(RUN_CODE.format(binary), timeout=timeout, data_consumer=stream)
+        stream.flush()
+        result["test_s"] = round(time.monotonic() - t1, 3)
+        if binary:
+            records = results.decode(stream.raw)[0]
+            result["records"] = records
+            names, statuses = runner_constants()
+            for r in records:
+                if r["test_id"] == results.RUNNER and r["step"] < len(names):
+                    result["tests"][names[r["step"]]] = {
+                        "status": statuses[r["flags"]], "ms": r["duration_us"] // 1000}
+        for line in stream.lines:
+            fields = line.split()
+            if len(fields) == 3 and fields[1] in ("PASS", "FAIL", "TIMEOUT", "ERROR"):
+                result["tests"][fields[0]] = {"status": fields[1],
+                                              "ms": int(fields[2].rstrip("ms"))}
+            elif fields[:1] == ["RUNNER_RESULT"]:
+                result["passed"] = fields[1:] == ["True"]
+        repl.exit()
+    except (OSError, RawReplError) as e:
+        result["error"] = str(e)
+        log(port, "ERROR: {}".format(e))
+    finally:
+        if repl:
+            repl.close()
+    result["total_s"] = round(time.monotonic() - t0, 3)
+    return result
+
+
+def run(ports, files, workers=None, baudrate=115200, timeout=300, quiet=False, binary=False,
+        variants=None):
+    variants = variants or {}
+    t0 = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or len(ports)) as pool:
+        futures = [pool.submit(validate_board, port, files, baudrate, timeout, quiet, binary,
+                               variants.get(port, variants.get(None)))
+                   for port in ports]
+        results = [future.result() for future in futures]
+    wall_s = time.monotonic() - t0
+    passed = sum(1 for r in results if r["passed"])
+    summary = {
+        "boards": len(results),
+        "passed": passed,
+        "failed": len(results) - passed,
+        "wall_s": round(wall_s, 3),
+        "boards_per_hour": round(len(results) * 3600 / wall_s, 1) if wall_s else None,
+        "results": results,
+    }
+    return summary
+
+
+def print_summary(summary):
+    print()
+    print("{:<24} {:<6} {:>7} {:>7} {:>7}  {}".format("port", "result", "sync", "test", "total", "tests"))
+    for r in summary["results"]:
+        tests = " ".join("{}={}".format(name, t["status"]) for name, t in r["tests"].items())
+        print("{:<24} {:<6} {:>6}s {:>6}s {:>6}s  {}".format(
+            r["port"], "PASS" if r["passed"] else "FAIL", r.get("sync_s", "-"),
+            r.get("test_s", "-"), r["total_s"], r["error"] or tests))
+    print("{}/{} boards passed in {}s ({} boards/hour)".format(
+        summary["passed"], summary["boards"], summary["wall_s"], summary["boards_per_hour"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ports", nargs="+", help="serial ports, one per board")
+    parser.add_argument("--workers", type=int, help="parallel workers (default: one per port)")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--timeout", type=float, default=300, help="test run timeout in seconds")
+    parser.add_argument("--quiet", action="store_true", help="don't stream board output")
+    parser.add_argument("--binary", action="store_true",
+                        help="collect results.py records instead of parsing printed lines")
+    parser.add_argument("--variant", action="append", metavar="[PORT=]VARIANT",
+                        help="board variant (e.g. NANO) for every port or for PORT; repeatable")
+    parser.add_argument("--json", help="write the aggregated results to this file")
+    args = parser.parse_args(argv)
+
+    summary = run(args.ports, load_files(DEVICE_FILES), args.workers, args.baud,
+                  args.timeout, args.quiet, args.binary, parse_variants(args.variant))
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Minimal MicroPython raw REPL client for Linux serial ports.
+
+Talks to a board over a tty (USB CDC, UART adapter or a pseudo-terminal)
+using only the standard library, so the host tools need no pyserial.
+"""
+import os
+import select
+import termios
+import time
+import tty
+
+RAW_PROMPT = b"raw REPL; CTRL-B to exit\r\n"
+CHUNK = 256
+# Pause after each chunk, as pyboard.py does, so boards whose REPL sits
+# behind a USB-UART bridge don't overrun their input buffer
+CHUNK_DELAY = 0.01
+
+BAUDRATES = {
+    9600: termios.B9600,
+    57600: termios.B57600,
+    115200: termios.B115200,
+    230400: termios.B230400,
+    460800: termios.B460800,
+    921600: termios.B921600,
+}
+
+
+class RawReplError(Exception):
+    pass
+
+
+class RawRepl:
+    def __init__(self, port, baudrate=115200):
+        self.port = port
+        self.fd = os.open(port, os.O_RDWR | os.O_NOCTTY)
+        tty.setraw(self.fd)
+        attrs = termios.tcgetattr(self.fd)
+        attrs[4] = attrs[5] = BAUDRATES.get(baudrate, termios.B115200)
+        termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+        self.buffer = b""
+
+    def close(self):
+        os.close(self.fd)
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+
+    def _fill(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        self.buffer += os.read(self.fd, 4096)
+        return True
+
+    def read_until(self, ending, timeout=10, data_consumer=None):
+        """Return everything up to and including ending.
+
+        data_consumer, if given, is called with each chunk as it arrives
+        (excluding the ending) so long-running output can be streamed.
+        """
+        deadline = time.monotonic() + timeout
+        streamed = 0
+        while True:
+            index = self.buffer.find(ending)
+            if index >= 0:
+                data = self.buffer[:index + len(ending)]
+                self.buffer = self.buffer[index + len(ending):]
+                if data_consumer and index > streamed:
+                    data_consumer(data[streamed:index])
+                return data
+            if data_consumer:
+                # Hold back a possible partial ending
+                safe = max(len(self.buffer) - len(ending) + 1, streamed)
+                if safe > streamed:
+                    data_consumer(self.buffer[streamed:safe])
+                    streamed = safe
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._fill(remaining):
+                raise RawReplError("{}: timeout waiting for {!r}".format(self.port, ending))
+
+    def enter(self, soft_reset=False):
+        self.write(b"\r\x03\x03")
+        # Drop whatever the interrupted program printed
+        while self._fill(0.1):
+            pass
+        self.buffer = b""
+        self.write(b"\r\x01")
+        self.read_until(RAW_PROMPT + b">")
+        if soft_reset:
+            self.soft_reset()
+
+    def soft_reset(self):
+        self.write(b"\x04")
+        self.read_until(b"soft reboot\r\n")
+        self.read_until(RAW_PROMPT)
+        self.read_until(b">")
+
+    def exit(self):
+        self.write(b"\r\x02")
+
+    def exec_(self, code, timeout=10, data_consumer=None):
+        """Run code and return its stdout; raise RawReplError with its stderr."""
+        if isinstance(code, str):
+            code = code.encode()
+        for i in range(0, len(code), CHUNK):
+            self.write(code[i:i + CHUNK])
+            time.sleep(CHUNK_DELAY)
+        self.write(b"\x04")
+        if self.read_until(b"OK", timeout=timeout) != b"OK":
+            raise RawReplError("{}: could not exec command".format(self.port))
+        out = self.read_until(b"\x04", timeout=timeout, data_consumer=data_consumer)[:-1]
+        err = self.read_until(b"\x04", timeout=timeout)[:-1]
+        self.read_until(b">", timeout=timeout)
+        if err:
+            raise RawReplError("{}: {}".format(self.port, err.decode(errors="replace").strip()))
+        return out
+
+    def file_hashes(self, names):
+        """Return {name: sha256 hex or None} for files on the board."""
+        code = (
+            "import hashlib,binascii\n"
+            "for n in {!r}:\n"
+            " try:\n"
+            "  h=hashlib.sha256()\n"
+            "  f=open(n,'rb')\n"
+            "  while 1:\n"
+            "   b=f.read(512)\n"
+            "   if not b:break\n"
+            "   h.update(b)\n"
+            "  f.close()\n"
+            "  print(n,binascii.hexlify(h.digest()).decode())\n"
+            " except OSError:\n"
+            "  print(n,'-')\n"
+        ).format(list(names))
+        hashes = {}
+        for line in self.exec_(code).decode().splitlines():
+            name, _, digest = line.strip().rpartition(" ")
+            if name:
+                hashes[name] = None if digest == "-" else digest
+        return hashes
+
+    def put_file(self, name, data):
+        self.exec_("f=open({!r},'wb')\nw=f.write".format(name))
+        for i in range(0, len(data), CHUNK):
+            self.exec_("w({!r})".format(data[i:i + CHUNK]))
+        self.exec_("f.close()")
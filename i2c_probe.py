@@ -0,0 +1,149 @@
+"""Targeted I2C topology probe with a cached device map.
+
+A full i2c.scan() addresses every 7-bit address on each boot, although
+the board profile already says what should be on the bus. probe() only
+touches those addresses and identifies each device with one cheap read:
+the SSD1306 status byte or the TCA9534 configuration and polarity registers.
+A device that answers with the wrong identity is classed UNKNOWN. 24Cxx
+EEPROMs have no register that could identify them without a write, so they
+are classified by address alone: anything that acks a one-byte read at an
+EEPROM address counts as an EEPROM. The topology found is saved to
+CACHE_FILE; later boots only re-check the cached devices and fall back to
+a full scan when they no longer answer.
+
+    devices = i2c_probe.find_devices(board)          # {address: kind}
+"""
+import json
+
+CACHE_FILE = "i2c_topology.json"
+
+SSD1306 = "ssd1306"
+TCA9534 = "tca9534"
+EEPROM = "eeprom"
+UNKNOWN = "unknown"
+
+# EEPROM blocks on the test fixture: 24C64 at 0x50, M24C08 at 0x54-0x57
+EEPROM_ADDRESSES = (0x50, 0x54)
+
+TCA9534_POLARITY = 0x02
+TCA9534_CONFIG = 0x03
+
+
+def kind_for(addr):
+    """Device kind we fit at addr, from the parts' address ranges."""
+    if addr in (0x3C, 0x3D):
+        return SSD1306
+    if 0x20 <= addr <= 0x27 or 0x38 <= addr <= 0x3F:
+        return TCA9534
+    if 0x50 <= addr <= 0x57:
+        return EEPROM
+    return UNKNOWN
+
+
+def identify(i2c, addr, kind):
+    """Return kind if addr answers its identity read, UNKNOWN if it answers
+    with something else, or None if nothing answers."""
+    try:
+        if kind == TCA9534:
+            i2c.readfrom_mem(addr, TCA9534_CONFIG, 1)
+            # Nothing here writes the polarity inversion register, so it
+            # still holds its power-on 0x00
+            if i2c.readfrom_mem(addr, TCA9534_POLARITY, 1)[0] != 0x00:
+                return UNKNOWN
+        elif kind == SSD1306:
+            # Status byte: D6 is the display-off flag, D7 always reads 0
+            if i2c.readfrom(addr, 1)[0] & 0x80:
+                return UNKNOWN
+        elif kind == EEPROM:
+            # No identity to read; an ack at the address is all we check
+            i2c.readfrom(addr, 1)
+        else:
+            i2c.writeto(addr, b"")
+        return kind
+    except OSError:
+        return None
+
+
+def expected_devices(profile, key="i2c"):
+    """{address: kind} the board profile puts on the bus profile[key]."""
+    bus = profile[key]
+    devices = {}
+    if bus == profile["i2c"]:
+        devices[profile["oled_address"]] = SSD1306
+        tca = profile["tca9534"]
+        if tca["sda"] == bus["sda"] and tca["scl"] == bus["scl"]:
+            devices[tca["address"]] = TCA9534
+    if bus == profile["eeprom_i2c"]:
+        for addr in EEPROM_ADDRESSES:
+            devices[addr] = EEPROM
+    return devices
+
+
+def probe(i2c, devices):
+    """Identify the addresses in {address: kind}, leaving out those that don't answer."""
+    found = {}
+    for addr, kind in devices.items():
+        kind = identify(i2c, addr, kind)
+        if kind is not None:
+            found[addr] = kind
+    return found
+
+
+def scan(i2c):
+    """Full bus scan, classifying each address that answers."""
+    found = {}
+    for addr in i2c.scan():
+        found[addr] = identify(i2c, addr, kind_for(addr)) or UNKNOWN
+    return found
+
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    try:
+        with open(path, "w") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print("Could not save I2C topology:", e)
+
+
+def topology(i2c, bus_key, expected, path=CACHE_FILE):
+    """Return ({address: kind}, source) for one bus.
+
+    source is "cache" if the cached and expected addresses answered exactly
+    as cached, "probe" if there was no cache and every expected device
+    answered with its identity, otherwise "scan".
+    """
+    cache = load_cache(path)
+    known = cache.get(bus_key)
+    candidates = dict(expected)
+    if known:
+        known = {addr: kind for addr, kind in known}
+        candidates.update(known)
+    found = probe(i2c, candidates)
+    if known and found == known:
+        source = "cache"
+    elif not known and found and found == candidates:
+        source = "probe"
+    else:
+        if known:
+            print("I2C topology changed, scanning bus")
+        found = scan(i2c)
+        source = "scan"
+    if source != "cache":
+        cache[bus_key] = sorted(found.items())
+        save_cache(cache, path)
+    return found, source
+
+
+def find_devices(board, key="i2c", path=CACHE_FILE):
+    """Devices on the board's "i2c" or "eeprom_i2c" bus as {address: kind}."""
+    cfg = board.profile[key]
+    bus_key = "{}:{}/{}".format(cfg["id"], cfg["sda"], cfg["scl"])
+    return topology(getattr(board, key), bus_key, expected_devices(board.profile, key), path)[0]
@@ -0,0 +1,151 @@
+"""Heap and GC instrumentation for test phases.
+
+Wrap each test phase in Profiler.phase() to record allocated bytes, peak
+heap use, GC count and the longest GC pause, and optionally fail the run
+when a phase allocates more than its budget:
+
+    prof = memprof.Profiler()
+    with prof.phase("gpio"):
+        test_gpio_bidirectional(pin_list, oled)
+    prof.report()
+    prof.check()
+
+Inside a phase the VM's own allocation threshold is switched off with
+gc.threshold(-1), and sample() runs a timed collection instead once
+COLLECT_EVERY bytes have been allocated since the last one, or free heap
+drops below GC_RESERVE. Collections the VM still runs on its own (on an
+allocation failure, or where gc.threshold() is missing) are found from the
+drop in gc.mem_alloc() and counted as untimed; their pause can't be
+measured, so a phase with any reports its max pause as unknown. Peak use is the highest value seen at sample points, so hot
+loops call memprof.sample() (a no-op outside a phase).
+"""
+import gc
+import time
+
+# Run a timed collection in sample() once free heap drops below this
+GC_RESERVE = 8 * 1024
+# ... or once this much has been allocated since the last collection
+COLLECT_EVERY = 4 * 1024
+
+# Allocation budgets in bytes per phase name; None means unlimited
+BUDGETS = {
+    "oled": None,
+    "gpio": None,
+    "relay": None,
+    "eeprom": None,
+    "uart": None,
+}
+
+_active = None
+
+
+class AllocationBudgetExceeded(Exception):
+    pass
+
+
+def sample():
+    """Sample the active phase, if any. Cheap enough for hot loops."""
+    if _active is not None:
+        _active.sample()
+
+
+class Phase:
+    def __init__(self, name, budget=None):
+        self.name = name
+        self.budget = budget
+        self.allocated = 0
+        self.peak = 0
+        self.gc_count = 0
+        self.untimed_gc_count = 0
+        self.max_gc_pause_us = 0
+        self.duration_us = 0
+        self._start = 0
+        self._last = 0
+        self._reclaimed = 0
+        self._collected_at = 0
+        self._threshold = None
+        self._t0 = 0
+        self._outer = None
+
+    def __enter__(self):
+        global _active
+        # Start from a clean heap so the phase isn't billed for earlier garbage
+        gc.collect()
+        if hasattr(gc, "threshold"):
+            self._threshold = gc.threshold()
+            gc.threshold(-1)
+        self._start = self._last = self.peak = self._collected_at = gc.mem_alloc()
+        self._outer = _active
+        _active = self
+        self._t0 = time.ticks_us()
+        return self
+
+    def sample(self):
+        current = gc.mem_alloc()
+        if current < self._last:
+            # The VM collected on its own
+            self.gc_count += 1
+            self.untimed_gc_count += 1
+            self._reclaimed += self._last - current
+        elif current > self.peak:
+            self.peak = current
+        self._last = current
+        if gc.mem_free() < GC_RESERVE or current - self._collected_at > COLLECT_EVERY:
+            self.collect()
+
+    def collect(self):
+        before = gc.mem_alloc()
+        t0 = time.ticks_us()
+        gc.collect()
+        pause = time.ticks_diff(time.ticks_us(), t0)
+        self._last = self._collected_at = gc.mem_alloc()
+        self._reclaimed += before - self._last
+        self.gc_count += 1
+        if pause > self.max_gc_pause_us:
+            self.max_gc_pause_us = pause
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        self.duration_us = time.ticks_diff(time.ticks_us(), self._t0)
+        self.sample()
+        self.allocated = self._last - self._start + self._reclaimed
+        if self._threshold is not None:
+            gc.threshold(self._threshold)
+        _active = self._outer
+        return False
+
+    def over_budget(self):
+        return self.budget is not None and self.allocated > self.budget
+
+    def max_pause_us(self):
+        """Longest GC pause, or None if an untimed collection may have been longer."""
+        return None if self.untimed_gc_count else self.max_gc_pause_us
+
+    def summary(self):
+        pause = self.max_pause_us()
+        return "{}: alloc={}B peak={}B gc={} ({} untimed) max_pause={}us time={}ms{}".format(
+            self.name, self.allocated, self.peak, self.gc_count, self.untimed_gc_count,
+            "?" if pause is None else pause, self.duration_us // 1000,
+            " OVER BUDGET ({}B)".format(self.budget) if self.over_budget() else "")
+
+
+class Profiler:
+    def __init__(self):
+        self.phases = []
+
+    def phase(self, name, budget=None):
+        if budget is None:
+            budget = BUDGETS.get(name)
+        phase = Phase(name, budget)
+        self.phases.append(phase)
+        return phase
+
+    def report(self):
+        for phase in self.phases:
+            print(phase.summary())
+
+    def check(self):
+        """Raise AllocationBudgetExceeded if any phase went over its budget."""
+        over = [phase.name for phase in self.phases if phase.over_budget()]
+        if over:
+            raise AllocationBudgetExceeded("Allocation budget exceeded: " + ", ".join(over))
@@ -0,0 +1,131 @@
+"""Persistent crash and reset-cause ring log in EEPROM.
+
+Fixed-size 16-byte records live in a reserved, page-aligned region of an
+EEPROM (see the EEPROM classes in testEEPROM.py). Each record carries a
+sequence number, so appending is a single page write to the slot after the
+newest one. On boot the whole region is fetched with one sequential read
+and the newest record is the valid one with the highest sequence number;
+torn or erased slots are skipped, so a write interrupted by a power loss
+or the WDT costs at most that one record.
+
+Record layout (little endian):
+    seq u32 | reset cause u8 | error u8 | checkpoint u16 | uptime_ms u32 |
+    reserved u16 | crc16 u16
+"""
+import machine
+import struct
+import time
+from results import crc16
+
+RECORD_FORMAT = "<IBBHIH"
+RECORD_SIZE = 16
+
+# Reserved region: the EEPROM self test works from the middle and the top
+# address, so the log sits at the bottom of the device
+RESET_LOG_BASE = 0x0000
+RESET_LOG_SLOTS = 16
+
+# Error codes
+EVENT_BOOT = 0
+ERR_TASK_STALE = 1
+ERR_EXCEPTION = 2
+ERR_TEST_TIMEOUT = 3
+
+RESET_CAUSES = {}
+for _name in ("PWRON_RESET", "HARD_RESET", "WDT_RESET", "DEEPSLEEP_RESET", "SOFT_RESET"):
+    if hasattr(machine, _name):
+        RESET_CAUSES[getattr(machine, _name)] = _name
+
+
+class ResetLog:
+    """Circular event log stored in a reserved region of an EEPROM."""
+
+    def __init__(self, eeprom, base=RESET_LOG_BASE, slots=RESET_LOG_SLOTS):
+        if base % eeprom.page_size or eeprom.page_size % RECORD_SIZE:
+            raise ValueError("Reset log must be page aligned")
+        if base + slots * RECORD_SIZE > eeprom.size:
+            raise ValueError("Reset log does not fit in EEPROM")
+        self.eeprom = eeprom
+        self.base = base
+        self.slots = slots
+        # Last task checkpoint, set freely by tasks and stored with each record
+        self.checkpoint = 0
+        self.head = -1
+        self.seq = 0
+        self.find_newest()
+
+    @staticmethod
+    def _parse(raw):
+        if raw is None or len(raw) != RECORD_SIZE:
+            return None
+        crc = raw[RECORD_SIZE - 2] | (raw[RECORD_SIZE - 1] << 8)
+        if crc != crc16(raw[:RECORD_SIZE - 2]):
+            return None
+        record = struct.unpack(RECORD_FORMAT, raw[:RECORD_SIZE - 2])[:5]
+        # Erased slots already fail the CRC; this is only a safety net
+        if record[0] == 0xFFFFFFFF:
+            return None
+        return record
+
+    def read_slot(self, slot):
+        """Return (seq, cause, error, checkpoint, uptime_ms) or None if empty/corrupt."""
+        return self._parse(self.eeprom.read_block(self.base + slot * RECORD_SIZE, RECORD_SIZE))
+
+    def find_newest(self):
+        """Locate the valid record with the highest sequence number and return it."""
+        self.head = -1
+        self.seq = 0
+        raw = self.eeprom.read_block(self.base, self.slots * RECORD_SIZE)
+        if raw is None:
+            return None
+        newest = None
+        for slot in range(self.slots):
+            record = self._parse(raw[slot * RECORD_SIZE:(slot + 1) * RECORD_SIZE])
+            if record is not None and record[0] > self.seq:
+                newest = record
+                self.head = slot
+                self.seq = record[0]
+        return newest
+
+    def append(self, cause, error=EVENT_BOOT, checkpoint=None, uptime_ms=None):
+        """Write one record into the next slot with a single page write."""
+        if checkpoint is None:
+            checkpoint = self.checkpoint
+        if uptime_ms is None:
+            uptime_ms = time.ticks_ms()
+        seq = self.seq + 1
+        slot = (self.head + 1) % self.slots
+        record = struct.pack(RECORD_FORMAT, seq, cause & 0xFF, error & 0xFF,
+                             checkpoint & 0xFFFF, uptime_ms & 0xFFFFFFFF, 0)
+        record += struct.pack("<H", crc16(record))
+        if not self.eeprom.write_page(self.base + slot * RECORD_SIZE, record):
+            return False
+        self.head = slot
+        self.seq = seq
+        return True
+
+    def newest(self):
+        if self.head < 0:
+            return None
+        return self.read_slot(self.head)
+
+    def records(self):
+        """Yield valid records newest first, skipping torn slots."""
+        if self.head < 0:
+            return
+        seq = self.seq + 1
+        for i in range(self.slots):
+            record = self.read_slot((self.head - i) % self.slots)
+            if record is None:
+                continue
+            # A higher number means we've wrapped round to newer records
+            if record[0] >= seq:
+                return
+            seq = record[0]
+            yield record
+
+    @staticmethod
+    def describe(record):
+        seq, cause, error, checkpoint, uptime_ms = record
+        return "#{} cause={} error={} checkpoint={} uptime={}ms".format(
+            seq, RESET_CAUSES.get(cause, cause), error, checkpoint, uptime_ms)
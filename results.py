@@ -0,0 +1,141 @@
+"""Compact binary result stream for the device tests.
+
+Every check a test makes can be sent as a fixed 16-byte record instead of
+a printed line:
+
+    test id u8 | flags u8 | step u16 | expected i32 | observed i32 | duration_us u32
+
+Each record is followed by a CRC-16 and framed SLIP-style between END
+bytes. Bytes that would upset a raw REPL or a cooked console (END, ESC,
+0x04, LF and CR) are escaped, so frames can share the USB REPL with
+ordinary prints or go out over a spare UART. decode() recovers the
+records on the host; host/decode_results.py turns them into CSV or JSON.
+
+    results.open_usb()          # or results.open_uart(uart)
+    if not results.record(results.GPIO, step, 1, value, us):
+        print(msg)              # only when no stream is open
+"""
+import struct
+import sys
+
+RECORD_FORMAT = "<BBHiiI"
+RECORD_SIZE = 16
+
+END = 0xC0
+ESC = 0xDB
+# Escaped byte -> code sent after ESC
+_ESCAPES = {0xC0: 0xDC, 0xDB: 0xDD, 0x04: 0xDE, 0x0A: 0xDF, 0x0D: 0xE0}
+_UNESCAPES = {code: byte for byte, code in _ESCAPES.items()}
+
+# Test ids
+GPIO = 1
+UART = 2
+EEPROM = 3
+RELAY = 4
+OLED = 5
+GPIO_TIMING = 6
+RUNNER = 7
+
+TEST_NAMES = {GPIO: "gpio", UART: "uart", EEPROM: "eeprom", RELAY: "relay",
+              OLED: "oled", GPIO_TIMING: "gpio_timing", RUNNER: "runner"}
+
+_stream = None
+_record = bytearray(RECORD_SIZE)
+
+
+def crc16(data, crc=0xFFFF):
+    """CRC-16/CCITT-FALSE."""
+    for b in data:
+        crc ^= b << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+def open_stream(stream):
+    """Send records to anything with write(bytes); None turns streaming off."""
+    global _stream
+    _stream = stream
+
+
+def open_usb():
+    open_stream(getattr(sys.stdout, "buffer", sys.stdout))
+
+
+def open_uart(uart):
+    open_stream(uart)
+
+
+def close():
+    open_stream(None)
+
+
+def active():
+    return _stream is not None
+
+
+def encode(test_id, step, expected, observed, duration_us=0, flags=0):
+    struct.pack_into(RECORD_FORMAT, _record, 0, test_id, flags, step & 0xFFFF,
+                     expected, observed, duration_us & 0xFFFFFFFF)
+    crc = crc16(_record)
+    frame = bytearray([END])
+    for b in _record + bytes([crc & 0xFF, crc >> 8]):
+        code = _ESCAPES.get(b)
+        if code is None:
+            frame.append(b)
+        else:
+            frame.append(ESC)
+            frame.append(code)
+    frame.append(END)
+    return frame
+
+
+def record(test_id, step, expected, observed, duration_us=0, flags=0):
+    """Emit one record; returns False (so the caller prints instead) if no stream is open."""
+    if _stream is None:
+        return False
+    _stream.write(encode(test_id, step, expected, observed, duration_us, flags))
+    return True
+
+
+def _unescape(segment):
+    out = bytearray()
+    escaped = False
+    for b in segment:
+        if escaped:
+            if b not in _UNESCAPES:
+                return None
+            out.append(_UNESCAPES[b])
+            escaped = False
+        elif b == ESC:
+            escaped = True
+        else:
+            out.append(b)
+    return None if escaped else bytes(out)
+
+
+def decode(data):
+    """Split a captured stream into (records, text).
+
+    records is a list of dicts; text holds everything between frames, such
+    as ordinary prints, with frames removed.
+    """
+    records = []
+    text = bytearray()
+    for segment in bytes(data).split(bytes([END])):
+        body = _unescape(segment)
+        if body is not None and len(body) == RECORD_SIZE + 2:
+            crc = body[RECORD_SIZE] | (body[RECORD_SIZE + 1] << 8)
+            if crc == crc16(body[:RECORD_SIZE]):
+                test_id, flags, step, expected, observed, duration_us = \
+                    struct.unpack(RECORD_FORMAT, body[:RECORD_SIZE])
+                records.append({"test": TEST_NAMES.get(test_id, str(test_id)),
+                                "test_id": test_id, "step": step, "expected": expected,
+                                "observed": observed, "duration_us": duration_us,
+                                "flags": flags, "passed": expected == observed})
+                continue
+        text += segment
+    return records, bytes(text)
@@ -0,0 +1,118 @@
+"""Manifest-driven on-device test runner.
+
+Imports the test scripts as modules (their main() only runs when they are
+executed directly) and runs the tests listed in MANIFEST as asyncio tasks.
+Tests whose peripherals share no pins run concurrently, so validating a
+whole board takes about as long as its slowest test; tests that share a
+pin are serialised. Each test gets a timeout, and one compact summary is
+printed at the end.
+
+A test is called with the Board from boards.get_board() and returns True
+on pass. Coroutine tests interleave with each other; a plain function
+blocks the others while it runs and can't be interrupted by its timeout.
+"""
+import asyncio
+import time
+import boards
+import results
+
+# name, module, function, timeout_ms, board profile keys the test drives
+MANIFEST = [
+    ("gpio", "HOSTP12", "test_gpio_async", 5000, ["gpio"]),
+    ("eeprom", "testEEPROM", "test_eeprom_async", 10000, ["eeprom_i2c"]),
+    ("uart", "RS485Test", "test_uart_async", 15000, ["uart_test", "uart_rs485"]),
+]
+
+STATUSES = ["PASS", "FAIL", "TIMEOUT", "ERROR"]
+
+
+def profile_pins(profile, keys):
+    pins = set()
+    for key in keys:
+        value = profile[key]
+        if isinstance(value, dict):
+            for name in ("sda", "scl", "tx", "rx"):
+                if name in value:
+                    pins.add(value[name])
+        elif isinstance(value, list):
+            pins.update(value)
+        else:
+            pins.add(value)
+    return pins
+
+
+def conflict_locks(board, manifest):
+    """Give tests that share a pin the same asyncio.Lock."""
+    groups = []
+    for entry in manifest:
+        pins = profile_pins(board.profile, entry[4])
+        merged = [entry[0]]
+        for group in groups[:]:
+            if group[1] & pins:
+                merged += group[0]
+                pins |= group[1]
+                groups.remove(group)
+        groups.append((merged, pins))
+    locks = {}
+    for names, pins in groups:
+        lock = asyncio.Lock()
+        for name in names:
+            locks[name] = lock
+    return locks
+
+
+async def run_test(board, entry, lock, outcomes):
+    name, module_name, func_name, timeout_ms, keys = entry
+    async with lock:
+        t0 = time.ticks_ms()
+        try:
+            module = __import__(module_name)
+            result = getattr(module, func_name)(board)
+            if hasattr(result, "send"):
+                result = await asyncio.wait_for(result, timeout_ms / 1000)
+            status = "PASS" if result else "FAIL"
+        except asyncio.TimeoutError:
+            status = "TIMEOUT"
+        except Exception as e:
+            print("{}: {}".format(name, e))
+            status = "ERROR"
+        outcomes[name] = (status, time.ticks_diff(time.ticks_ms(), t0))
+
+
+async def run_manifest(manifest=MANIFEST):
+    board = boards.get_board()
+    if board is None:
+        return False
+    outcomes = {}
+    locks = conflict_locks(board, manifest)
+    t0 = time.ticks_ms()
+    await asyncio.gather(*[run_test(board, entry, locks[entry[0]], outcomes)
+                           for entry in manifest])
+    elapsed = time.ticks_diff(time.ticks_ms(), t0)
+    passed = 0
+    total_ms = 0
+    for index, entry in enumerate(manifest):
+        status, duration = outcomes[entry[0]]
+        passed += status == "PASS"
+        total_ms += duration
+        # Result record: observed 1 on pass, flags give the status
+        if not results.record(results.RUNNER, index, 1, int(status == "PASS"),
+                              duration * 1000, STATUSES.index(status)):
+            print("{:<8} {:<7} {:>6}ms".format(entry[0], status, duration))
+    print("{}/{} passed in {}ms (sequential {}ms)".format(passed, len(manifest), elapsed, total_ms))
+    return passed == len(manifest)
+
+
+def main(binary=False):
+    # binary=True streams results.py records over the USB REPL instead of
+    # printing a line per check
+    if binary:
+        results.open_usb()
+    try:
+        return asyncio.run(run_manifest())
+    finally:
+        results.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Pseudo-terminal boards that speak the MicroPython raw REPL.
+
+Each board is a process running the simulated hardware, serving the raw
+REPL on its own pty and keeping its files in a directory of its own, so
+host tools such as host/orchestrator.py can be tried without hardware:
+
+    PYTHONPATH=sim python3 sim/fakeboard.py --count 4 --root /tmp/boards
+
+prints one "PORT <path>" line per board and serves until interrupted.
+"""
+import argparse
+import os
+import pty
+import select
+import signal
+import sys
+import time
+import traceback
+import tty
+
+RAW_PROMPT = b"raw REPL; CTRL-B to exit\r\n>"
+BANNER = b"MicroPython (simulated); Type \"help()\" for more information.\r\n>>> "
+
+
+class RawPtyWriter:
+    """sys.stdout.buffer replacement: bytes go to the pty untranslated."""
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def write(self, data):
+        data = bytes(data)
+        while data:
+            data = data[os.write(self.fd, data):]
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class PtyWriter:
+    """sys.stdout replacement that streams to the pty like a board would."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.buffer = RawPtyWriter(fd)
+
+    def write(self, text):
+        data = text.replace("\n", "\r\n").encode()
+        while data:
+            data = data[os.write(self.fd, data):]
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class FakeBoard:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.raw = False
+        self.code = b""
+        self.globals = {"__name__": "__main__"}
+
+    def send(self, data):
+        while data:
+            data = data[os.write(self.master, data):]
+
+    def soft_reset(self):
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None) or ""
+            if path.startswith(self.root + os.sep):
+                del sys.modules[name]
+        self.globals = {"__name__": "__main__"}
+
+    def execute(self, code):
+        writer = PtyWriter(self.master)
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout = writer
+        error = ""
+        try:
+            exec(compile(code, "<stdin>", "exec"), self.globals)
+        except SystemExit:
+            pass
+        except BaseException:
+            error = traceback.format_exc()
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+        self.send(b"\x04" + error.replace("\n", "\r\n").encode() + b"\x04>")
+
+    def feed(self, byte):
+        if byte == 0x03:
+            self.code = b""
+        elif byte == 0x01:
+            self.raw = True
+            self.code = b""
+            self.send(b"\r\n" + RAW_PROMPT)
+        elif byte == 0x02:
+            self.raw = False
+            self.send(b"\r\n" + BANNER)
+        elif not self.raw:
+            # The friendly REPL isn't simulated
+            pass
+        elif byte == 0x04:
+            code, self.code = self.code, b""
+            if not code:
+                self.soft_reset()
+                self.send(b"OK\r\nMPY: soft reboot\r\n" + RAW_PROMPT)
+                return
+            self.send(b"OK")
+            self.execute(code.decode())
+        else:
+            self.code += bytes([byte])
+
+    def serve(self):
+        os.chdir(self.root)
+        sys.path.insert(0, self.root)
+        while True:
+            select.select([self.master], [], [])
+            for byte in os.read(self.master, 4096):
+                self.feed(byte)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve simulated boards on pseudo-terminals")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--root", default="fakeboards", help="directory for the boards' files")
+    args = parser.parse_args(argv)
+    if not hasattr(time, "ticks_ms"):
+        sys.exit("Run with the simulator on the path: PYTHONPATH=sim")
+
+    children = []
+    for i in range(args.count):
+        board = FakeBoard(os.path.join(args.root, "board{}".format(i)))
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            board.serve()
+        children.append(pid)
+        print("PORT", board.port)
+        sys.stdout.flush()
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""CPython stand-in for the MicroPython machine module (see simhw.py)."""
+import os
+import sys
+import threading
+
+import simhw
+
+PWRON_RESET = 1
+HARD_RESET = 2
+WDT_RESET = 3
+DEEPSLEEP_RESET = 4
+SOFT_RESET = 5
+
+# Process exit code used when the simulated WDT fires
+WDT_EXIT_CODE = 3
+
+
+def freq():
+    return 125_000_000
+
+
+def unique_id():
+    return b"\x00SIMHOST"
+
+
+def reset_cause():
+    path = simhw.state_path("reset_cause")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return int(f.read() or PWRON_RESET)
+    return PWRON_RESET
+
+
+def _record_reset(cause):
+    path = simhw.state_path("reset_cause")
+    if path:
+        with open(path, "w") as f:
+            f.write(str(cause))
+
+
+def reset():
+    _record_reset(HARD_RESET)
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def soft_reset():
+    _record_reset(SOFT_RESET)
+    raise SystemExit
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    # Shared state of every pin number: driven level, mode, pull, irq
+    _levels = {}
+    _modes = {}
+    _pulls = {}
+    _irqs = {}
+
+    def __init__(self, id, mode=-1, pull=-1, *, value=None):
+        simhw.ensure_fixture()
+        self.id = id
+        self.init(mode, pull, value=value)
+
+    def init(self, mode=-1, pull=-1, *, value=None):
+        if mode != -1:
+            Pin._modes[self.id] = mode
+        if pull != -1:
+            Pin._pulls[self.id] = pull
+        if value is not None:
+            self.value(value)
+
+    def _driver_level(self):
+        # Level seen on this pin: its own output, else a linked output, else the pull
+        if Pin._modes.get(self.id) == Pin.OUT:
+            return Pin._levels.get(self.id, 0)
+        for other in simhw.pin_links.get(self.id, ()):
+            if Pin._modes.get(other) == Pin.OUT:
+                return Pin._levels.get(other, 0)
+        return 1 if Pin._pulls.get(self.id) == Pin.PULL_UP else 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._driver_level()
+        v = 1 if v else 0
+        old = Pin._levels.get(self.id, 0)
+        Pin._levels[self.id] = v
+        if old != v and Pin._modes.get(self.id) == Pin.OUT:
+            trigger = Pin.IRQ_RISING if v else Pin.IRQ_FALLING
+            for other in simhw.pin_links.get(self.id, ()):
+                irq = Pin._irqs.get(other)
+                if irq and irq[1] & trigger:
+                    simhw.advance_us(simhw.PROPAGATION_US)
+                    irq[0](Pin(other))
+        return None
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(not Pin._levels.get(self.id, 0))
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, *, priority=1, wake=None, hard=False):
+        if handler is None:
+            Pin._irqs.pop(self.id, None)
+        else:
+            Pin._irqs[self.id] = (handler, trigger)
+
+    def __repr__(self):
+        return "Pin({})".format(self.id)
+
+
+class I2C:
+    def __init__(self, id=0, *, scl=None, sda=None, freq=400_000, timeout=50_000):
+        simhw.ensure_fixture()
+        self.id = id
+        self.freq = freq
+        self.scl = scl
+        self.sda = sda
+
+    def _device(self, addr):
+        device = simhw.i2c_buses.get(self.id, {}).get(addr)
+        if device is None:
+            raise simhw.I2CNack()
+        return device
+
+    def scan(self):
+        found = []
+        for addr in range(0x08, 0x78):
+            simhw.account("i2c", self.id, 0, simhw.i2c_time_us(self.freq, 0))
+            device = simhw.i2c_buses.get(self.id, {}).get(addr)
+            if device is None:
+                continue
+            try:
+                device.write(addr, b"")
+                found.append(addr)
+            except OSError:
+                pass
+        return found
+
+    def writeto(self, addr, buf, stop=True):
+        simhw.account("i2c", self.id, len(buf), simhw.i2c_time_us(self.freq, len(buf)))
+        self._device(addr).write(addr, bytes(buf))
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        return self.writeto(addr, b"".join(bytes(b) for b in vector), stop)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        simhw.account("i2c", self.id, nbytes, simhw.i2c_time_us(self.freq, nbytes))
+        return self._device(addr).read(addr, nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self.readfrom(addr, len(buf), stop)
+
+    def _mem_addr(self, memaddr, addrsize):
+        return memaddr.to_bytes(addrsize // 8, "big")
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        data = self._mem_addr(memaddr, addrsize) + bytes(buf)
+        simhw.account("i2c", self.id, len(data), simhw.i2c_time_us(self.freq, len(data)))
+        self._device(addr).write(addr, data)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        mem = self._mem_addr(memaddr, addrsize)
+        simhw.account("i2c", self.id, len(mem) + nbytes,
+                      simhw.i2c_time_us(self.freq, len(mem) + nbytes, restart=True))
+        device = self._device(addr)
+        device.write(addr, mem)
+        return device.read(addr, nbytes)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf), addrsize=addrsize)
+
+
+class SoftI2C(I2C):
+    pass
+
+
+class UART:
+    # uart id -> [baudrate, rx buffer, rxbuf size]
+    _ports = {}
+
+    def __init__(self, id, baudrate=9600, bits=8, parity=None, stop=1, *, tx=None, rx=None,
+                 rxbuf=256, timeout=0, **kwargs):
+        simhw.ensure_fixture()
+        self.id = id
+        self.timeout = timeout
+        state = UART._ports.setdefault(id, [baudrate, bytearray(), rxbuf])
+        state[0] = baudrate
+        state[2] = rxbuf
+        self.init(baudrate)
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate is not None:
+            UART._ports[self.id][0] = baudrate
+        self.baudrate = UART._ports[self.id][0]
+
+    def _rx(self):
+        return UART._ports[self.id][1]
+
+    def write(self, buf):
+        buf = bytes(buf)
+        simhw.account("uart", self.id, len(buf), simhw.uart_time_us(self.baudrate, len(buf)))
+        peer = simhw.uart_peers.get(self.id)
+        if peer is None or peer not in UART._ports:
+            return len(buf)
+        peer_baud, peer_rx, peer_size = UART._ports[peer]
+        if peer_baud != self.baudrate:
+            # Mismatched baud rates: the receiver sees garbage
+            buf = bytes((b ^ 0x5A) for b in buf)
+        peer_rx.extend(buf)
+        del peer_rx[:-peer_size]
+        return len(buf)
+
+    def any(self):
+        return len(self._rx())
+
+    def _wait_timeout(self):
+        simhw.advance_us(self.timeout * 1000)
+
+    def read(self, nbytes=None):
+        rx = self._rx()
+        if not rx:
+            self._wait_timeout()
+            return None
+        nbytes = len(rx) if nbytes is None else min(nbytes, len(rx))
+        data = bytes(rx[:nbytes])
+        del rx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        data = self.read(len(buf) if nbytes is None else nbytes)
+        if data is None:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def readline(self):
+        rx = self._rx()
+        end = rx.find(b"\n")
+        if end < 0:
+            self._wait_timeout()
+            if not rx:
+                return None
+            end = len(rx) - 1
+        data = bytes(rx[:end + 1])
+        del rx[:end + 1]
+        return data
+
+    def flush(self):
+        pass
+
+    def txdone(self):
+        return True
+
+    def deinit(self):
+        pass
+
+
+class WDT:
+    """Watchdog that ends the process (like a reset) when not fed in time."""
+
+    def __init__(self, id=0, timeout=5000):
+        self.timeout_us = timeout * 1000
+        self.last_feed = simhw.now_us()
+        thread = threading.Thread(target=self._watch, daemon=True)
+        thread.start()
+
+    def feed(self):
+        self.last_feed = simhw.now_us()
+
+    def _watch(self):
+        event = threading.Event()
+        while True:
+            event.wait(0.01)
+            if simhw.now_us() - self.last_feed > self.timeout_us:
+                print("WDT reset")
+                sys.stdout.flush()
+                _record_reset(WDT_RESET)
+                os._exit(WDT_EXIT_CODE)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._thread = None
+        self._stop = threading.Event()
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, *, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+        if freq > 0:
+            period = 1000 / freq
+        self._stop = threading.Event()
+
+        def run(stop=self._stop):
+            while not stop.wait(period / 1000):
+                callback(self)
+                if mode == Timer.ONE_SHOT:
+                    return
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def deinit(self):
+        self._stop.set()
@@ -0,0 +1,25 @@
+"""CPython stand-in for the MicroPython micropython module."""
+
+
+def const(value):
+    return value
+
+
+def native(func):
+    return func
+
+
+viper = native
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(func, arg):
+    func(arg)
+    return True
+
+
+def mem_info(verbose=False):
+    pass
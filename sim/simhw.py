@@ -0,0 +1,337 @@
+"""Simulated HOSTP12 hardware for running the drivers on CPython.
+
+Holds the virtual clock, the bus timing model, the device models attached
+to the simulated I2C buses and the default fixture wiring. The machine,
+framebuf and micropython stand-ins in this directory are thin wrappers
+around it.
+
+The clock is real elapsed time plus everything the simulation accounts
+for: time.sleep*() and asyncio.sleep_ms() return as soon as they can and
+advance the clock instead (see sitecustomize.py), and every bus transaction advances it by its on-wire time (bytes x bit time
+at the configured freq/baudrate). The per-bus counters in stats() only
+include modelled time, so they are deterministic across runs and hosts.
+
+Run any script unchanged with the simulator first on the path:
+
+    PYTHONPATH=sim:. python3 HOSTP12.py
+
+SIM_PLATFORM picks the board profile (default rp2), SIM_STATE_DIR keeps
+EEPROM contents and the reset cause across runs, and SIM_REALTIME=1 makes
+sleeps and bus time block for real.
+"""
+import errno
+import os
+import time
+
+TICKS_PERIOD = 1 << 30
+
+_perf_counter = time.perf_counter
+_real_sleep = time.sleep
+_start = _perf_counter()
+_offset_us = 0
+REALTIME = os.environ.get("SIM_REALTIME", "0") == "1"
+STATE_DIR = os.environ.get("SIM_STATE_DIR")
+
+
+def now_us():
+    return int((_perf_counter() - _start) * 1_000_000) + _offset_us
+
+
+def advance_us(us):
+    global _offset_us
+    if REALTIME:
+        _real_sleep(us / 1_000_000)
+    else:
+        _offset_us += int(us)
+
+
+# ---- statistics ----
+
+_stats = {}
+
+
+def _bus_stats(kind, bus_id):
+    key = "{}{}".format(kind, bus_id)
+    entry = _stats.get(key)
+    if entry is None:
+        entry = {"transactions": 0, "bytes": 0, "bus_us": 0}
+        _stats[key] = entry
+    return entry
+
+
+def account(kind, bus_id, nbytes, us):
+    entry = _bus_stats(kind, bus_id)
+    entry["transactions"] += 1
+    entry["bytes"] += nbytes
+    entry["bus_us"] += us
+    advance_us(us)
+
+
+def stats():
+    """Return a copy of the per-bus counters, e.g. {"i2c0": {...}, "uart1": {...}}."""
+    return {key: dict(value) for key, value in _stats.items()}
+
+
+def reset_stats():
+    _stats.clear()
+
+
+def i2c_time_us(freq, nbytes, restart=False):
+    """On-wire time of one I2C transaction carrying nbytes after the address."""
+    # 9 clocks per byte (8 data + ACK), the address byte, START and STOP
+    bits = 9 * (nbytes + 1) + 2
+    if restart:
+        bits += 9 + 1
+    return bits * 1_000_000 / freq
+
+
+def uart_time_us(baudrate, nbytes):
+    # 8N1: start + 8 data + stop
+    return nbytes * 10 * 1_000_000 / baudrate
+
+
+# ---- persistent state (reset cause, EEPROM images) ----
+
+def state_path(name):
+    if not STATE_DIR:
+        return None
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, name)
+
+
+# ---- I2C device models ----
+
+class I2CNack(OSError):
+    def __init__(self):
+        super().__init__(errno.ENODEV, "ENODEV")
+
+
+class EEPROMModel:
+    """24Cxx EEPROM with page-write rollover and a write-cycle busy time."""
+
+    def __init__(self, size, page_size, addr_bytes, block_bits=0, write_cycle_us=5000, name=None):
+        self.size = size
+        self.page_size = page_size
+        self.addr_bytes = addr_bytes
+        self.block_bits = block_bits
+        self.write_cycle_us = write_cycle_us
+        self.pointer = 0
+        self.busy_until = 0
+        self.path = state_path(name + ".bin") if name else None
+        self.mem = bytearray(b"\xff" * size)
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                self.mem[:] = f.read(size).ljust(size, b"\xff")
+
+    def _check_ready(self):
+        if now_us() < self.busy_until:
+            raise I2CNack()
+
+    def write(self, address, data):
+        self._check_ready()
+        if len(data) < self.addr_bytes:
+            return
+        pointer = 0
+        for b in data[:self.addr_bytes]:
+            pointer = (pointer << 8) | b
+        if self.block_bits:
+            pointer |= (address & ((1 << self.block_bits) - 1)) << 8
+        self.pointer = pointer % self.size
+        payload = data[self.addr_bytes:]
+        if not payload:
+            return
+        page_start = self.pointer - self.pointer % self.page_size
+        offset = self.pointer % self.page_size
+        for b in payload:
+            self.mem[page_start + offset] = b
+            offset = (offset + 1) % self.page_size
+        self.pointer = page_start + offset
+        self.busy_until = now_us() + self.write_cycle_us
+        if self.path:
+            with open(self.path, "wb") as f:
+                f.write(self.mem)
+
+    def read(self, address, nbytes):
+        self._check_ready()
+        out = bytearray(nbytes)
+        for i in range(nbytes):
+            out[i] = self.mem[self.pointer]
+            self.pointer = (self.pointer + 1) % self.size
+        return bytes(out)
+
+
+class TCA9534Model:
+    """TCA9534 register file: input, output, polarity inversion, configuration."""
+
+    def __init__(self):
+        self.regs = bytearray([0xFF, 0xFF, 0x00, 0xFF])
+        self.pointer = 0
+        # Level seen on pins configured as inputs (pulled up by default)
+        self.external = 0xFF
+
+    def _input_port(self):
+        config = self.regs[3]
+        level = (self.regs[1] & ~config) | (self.external & config)
+        return (level ^ self.regs[2]) & 0xFF
+
+    def write(self, address, data):
+        if not data:
+            return
+        self.pointer = data[0] & 0x03
+        for b in data[1:]:
+            if self.pointer != 0:
+                self.regs[self.pointer] = b
+
+    def read(self, address, nbytes):
+        if self.pointer == 0:
+            value = self._input_port()
+        else:
+            value = self.regs[self.pointer]
+        return bytes([value]) * nbytes
+
+    def output(self, pin):
+        return (self.regs[1] >> pin) & 1
+
+
+class SSD1306Model:
+    """SSD1306 sink: decodes commands and keeps the GDDRAM contents."""
+
+    # Commands followed by parameter bytes
+    _PARAMS = {0x20: 1, 0x21: 2, 0x22: 2, 0x81: 1, 0x8D: 1, 0xA8: 1,
+               0xD3: 1, 0xD5: 1, 0xD9: 1, 0xDA: 1, 0xDB: 1}
+
+    def __init__(self, width=128, height=32):
+        self.width = width
+        self.height = height
+        self.gram = bytearray(width * (height // 8))
+        self.display_on = False
+        self.inverted = False
+        self.frames = 0
+        self.col_range = (0, width - 1)
+        self.page_range = (0, height // 8 - 1)
+        self.col = 0
+        self.page = 0
+        self._cmd = None
+        self._params = []
+
+    def _command(self, b):
+        if self._cmd is not None:
+            self._params.append(b)
+            if len(self._params) < self._PARAMS[self._cmd]:
+                return
+            cmd, params = self._cmd, self._params
+            self._cmd = None
+            self._params = []
+            if cmd == 0x21:
+                self.col_range = (params[0], params[1])
+                self.col = params[0]
+            elif cmd == 0x22:
+                self.page_range = (params[0], params[1])
+                self.page = params[0]
+            return
+        if b in self._PARAMS:
+            self._cmd = b
+            self._params = []
+        elif b & 0xFE == 0xAE:
+            self.display_on = bool(b & 1)
+        elif b & 0xFE == 0xA6:
+            self.inverted = bool(b & 1)
+
+    def _data(self, b):
+        if self.page < self.height // 8 and self.col < self.width:
+            self.gram[self.page * self.width + self.col] = b
+        if self.col >= self.col_range[1]:
+            self.col = self.col_range[0]
+            self.page = self.page + 1 if self.page < self.page_range[1] else self.page_range[0]
+            if self.page == self.page_range[0]:
+                self.frames += 1
+        else:
+            self.col += 1
+
+    def write(self, address, data):
+        i = 0
+        while i < len(data):
+            control = data[i]
+            i += 1
+            if control & 0x40:
+                # Co=0 data: everything that follows is display data
+                for b in data[i:]:
+                    self._data(b)
+                return
+            if i < len(data):
+                self._command(data[i])
+                i += 1
+            if not control & 0x80:
+                # Co=0 command: the rest of the transfer is commands
+                for b in data[i:]:
+                    self._command(b)
+                return
+
+    def read(self, address, nbytes):
+        # Status byte: D6 is set while the display is off
+        return bytes([0x00 if self.display_on else 0x40]) * nbytes
+
+    def render(self):
+        """Return the panel as text, one character per pixel."""
+        rows = []
+        for y in range(self.height):
+            row = []
+            for x in range(self.width):
+                bit = (self.gram[(y >> 3) * self.width + x] >> (y & 7)) & 1
+                row.append("#" if bit ^ self.inverted else ".")
+            rows.append("".join(row))
+        return "\n".join(rows)
+
+
+# ---- buses and fixture ----
+
+i2c_buses = {}     # bus id -> {address: device}
+uart_peers = {}    # uart id -> peer uart id
+pin_links = {}     # pin number -> [pin numbers driven by it]
+PROPAGATION_US = 2
+
+_fixture_installed = False
+
+
+def attach_i2c(bus_id, address, device):
+    i2c_buses.setdefault(bus_id, {})[address] = device
+
+
+def connect_uarts(a, b):
+    uart_peers[a] = b
+    uart_peers[b] = a
+
+
+def connect_pins(a, b):
+    pin_links.setdefault(a, []).append(b)
+    pin_links.setdefault(b, []).append(a)
+
+
+def ensure_fixture():
+    """Wire up the default HOSTP12 test fixture for the current board profile."""
+    global _fixture_installed
+    if _fixture_installed:
+        return
+    _fixture_installed = True
+    import sys
+    import boards
+    profile = None
+    for (platform, variant), candidate in boards.PROFILES.items():
+        if platform == sys.platform:
+            profile = candidate
+            break
+    if profile is None:
+        return
+    for bus in {profile["i2c"]["id"], profile["eeprom_i2c"]["id"]}:
+        attach_i2c(bus, profile["oled_address"], SSD1306Model())
+        attach_i2c(bus, 0x50, EEPROMModel(8192, 32, 2, name="eeprom50"))
+        m24c08 = EEPROMModel(1024, 16, 1, block_bits=2, name="eeprom54")
+        for address in range(0x54, 0x58):
+            attach_i2c(bus, address, m24c08)
+        expander = TCA9534Model()
+        for address in (0x20, 0x3f):
+            attach_i2c(bus, address, expander)
+    connect_uarts(profile["uart_test"]["id"], profile["uart_rs485"]["id"])
+    gpio = profile["gpio"]
+    for i in range(4):
+        connect_pins(gpio[i], gpio[i + 4])
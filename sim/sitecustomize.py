@@ -0,0 +1,100 @@
+"""Make CPython look like a MicroPython board when sim/ is on PYTHONPATH.
+
+Adds the MicroPython-only time and asyncio functions backed by the
+simulated clock in simhw.py: time.sleep*() advance it directly, and
+asyncio.sleep_ms() advances it to the earliest pending deadline once
+every task is waiting, so concurrent tests still overlap in simulated
+time. The simulated board is reported through sys.platform
+(SIM_PLATFORM, default "rp2"). gc.mem_alloc()/mem_free()
+are backed by tracemalloc, started on first use. To behave like a
+MicroPython heap, where nothing is reclaimed until the collector runs,
+gc.mem_alloc() reports the peak traced memory since the last
+gc.collect(); the figures still only roughly track a real heap.
+"""
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import simhw
+
+sys.platform = os.environ.get("SIM_PLATFORM", "rp2")
+
+# Simulated heap size reported through gc.mem_free()
+HEAP_SIZE = int(os.environ.get("SIM_HEAP_SIZE", 192 * 1024))
+
+
+def _ticks_ms():
+    return (simhw.now_us() // 1000) % simhw.TICKS_PERIOD
+
+
+def _ticks_us():
+    return simhw.now_us() % simhw.TICKS_PERIOD
+
+
+def _ticks_add(ticks, delta):
+    return (ticks + delta) % simhw.TICKS_PERIOD
+
+
+def _ticks_diff(end, start):
+    half = simhw.TICKS_PERIOD // 2
+    return ((end - start + half) % simhw.TICKS_PERIOD) - half
+
+
+time.ticks_ms = _ticks_ms
+time.ticks_us = _ticks_us
+time.ticks_cpu = _ticks_us
+time.ticks_add = _ticks_add
+time.ticks_diff = _ticks_diff
+time.sleep = lambda seconds: simhw.advance_us(seconds * 1_000_000)
+time.sleep_ms = lambda ms: simhw.advance_us(ms * 1000)
+time.sleep_us = lambda us: simhw.advance_us(us)
+# Deadlines (simulated us) of coroutines waiting in asyncio.sleep_ms()
+_sleepers = []
+
+
+async def _sleep_ms(ms):
+    # Every task gets a turn each time round the loop, so once the sleeper
+    # with the earliest deadline is resumed the rest are waiting too, and it
+    # can move the clock on to its deadline
+    if simhw.REALTIME:
+        await asyncio.sleep(ms / 1000)
+        return
+    deadline = simhw.now_us() + int(ms * 1000)
+    _sleepers.append(deadline)
+    try:
+        while True:
+            await asyncio.sleep(0)
+            now = simhw.now_us()
+            if now >= deadline:
+                return
+            if deadline == min(_sleepers):
+                simhw.advance_us(deadline - now)
+    finally:
+        _sleepers.remove(deadline)
+
+
+asyncio.sleep_ms = _sleep_ms
+
+
+_collect = gc.collect
+
+
+def _mem_alloc():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[1]
+
+
+def _gc_collect(*args):
+    found = _collect(*args)
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    return found
+
+
+gc.collect = _gc_collect
+gc.mem_alloc = _mem_alloc
+gc.mem_free = lambda: max(HEAP_SIZE - _mem_alloc(), 0)
@@ -132,6 +132,10 @@ class SSD1306_I2C(SSD1306):
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def status(self):
+        # Status byte: D6 is set while the display is off
+        return self.i2c.readfrom(self.addr, 1)[0]
+
     def write_data(self, buf):
         self.temp[0] = self.addr << 1
         self.temp[1] = 0x40  # Co=0, D/C#=1
@@ -19,10 +19,13 @@ class TCA9534:
     REGISTER_OUTPUT_PORT = 0X01    # register 1
     REGISTER_CONFIGURATION = 0X03    # register 3
 
-    def __init__(self, i2c_ch=0, tca9534_address=0x27,scl=Pin(9), sda=Pin(8),freq=400_000 ,output=True, bitmask=None):
-        """Default values taken from Sparkfun QWIIC GPIO board."""
+    def __init__(self, i2c_ch=0, tca9534_address=0x27,scl=Pin(9), sda=Pin(8),freq=400_000 ,output=True, bitmask=None, i2c=None):
+        """Default values taken from Sparkfun QWIIC GPIO board.
+
+        Pass an existing bus as i2c to share it instead of creating one.
+        """
         self.address = tca9534_address
-        self.bus = I2C(i2c_ch,scl=scl, sda=sda, freq=freq)
+        self.bus = i2c if i2c is not None else I2C(i2c_ch,scl=scl, sda=sda, freq=freq)
         if bitmask:
             bitmasks = bitmask.to_bytes(1, 'big')
             self.bus.writeto_mem(self.address, self.REGISTER_CONFIGURATION, bitmasks)
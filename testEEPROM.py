@@ -1,6 +1,13 @@
 import sys
-from machine import I2C, Pin
+import asyncio
 import time
+import boards
+import i2c_probe
+import memprof
+import results
+
+# Set to True to pick the EEPROM part from a menu instead of the board profile
+SELECT_EEPROM = False
 
 class EEPROM:
     def __init__(self, i2c, address, size, page_size, block_bits):
@@ -9,20 +16,24 @@ class EEPROM:
         self.size = size
         self.page_size = page_size
         self.block_bits = block_bits
+        # Per-byte [WRITE]/[READ] trace in write_byte/read_byte
+        self.trace = True
 
     def get_device_addr(self, addr):
         block = (addr >> 8) & ((1 << self.block_bits) - 1)
         return self.base_addr | block
 
-    def write_byte(self, addr, data):
+    def write_byte(self, addr, data, wait=True):
+        # With wait=False the caller must allow the 5 ms write cycle itself
         if addr < 0 or addr >= self.size:
             return False
         try:
-            device_addr = self.get_device_addr(addr)
-            offset = addr & 0xFF
-            print(f"[WRITE] DevAddr: {hex(device_addr)}, Offset: {hex(offset)}, Data: {hex(data)}")
-            self.i2c.writeto_mem(device_addr, offset, bytes([data]))
-            time.sleep_ms(5)
+            device_addr, offset, addrsize = self._locate(addr)
+            if self.trace:
+                print(f"[WRITE] DevAddr: {hex(device_addr)}, Offset: {hex(offset)}, Data: {hex(data)}")
+            self.i2c.writeto_mem(device_addr, offset, bytes([data]), addrsize=addrsize)
+            if wait:
+                time.sleep_ms(5)
             return True
         except Exception as e:
             print("Write error at address " + hex(addr) + ": " + str(e))
@@ -32,20 +43,65 @@ class EEPROM:
         if addr < 0 or addr >= self.size:
             return None
         try:
-            device_addr = self.get_device_addr(addr)
-            offset = addr & 0xFF
-            print(f"[READ] DevAddr: {hex(device_addr)}, Offset: {hex(offset)})")
-            return self.i2c.readfrom_mem(device_addr, offset, 1)[0]
+            device_addr, offset, addrsize = self._locate(addr)
+            if self.trace:
+                print(f"[READ] DevAddr: {hex(device_addr)}, Offset: {hex(offset)})")
+            return self.i2c.readfrom_mem(device_addr, offset, 1, addrsize=addrsize)[0]
         except Exception as e:
             print("Read error at address " + hex(addr) + ": " + str(e))
             return None
 
+    def _locate(self, addr):
+        # Devices without block select bits use 16-bit word addresses
+        if self.block_bits == 0 and self.size > 256:
+            return self.base_addr, addr, 16
+        return self.get_device_addr(addr), addr & 0xFF, 8
+
+    def write_page(self, addr, data, wait=True):
+        # Single page-write cycle, data must not cross a page boundary.
+        # With wait=False the caller must allow the 5 ms write cycle itself
+        if addr < 0 or addr + len(data) > self.size:
+            return False
+        if addr // self.page_size != (addr + len(data) - 1) // self.page_size:
+            print("Page write crosses page boundary at address " + hex(addr))
+            return False
+        try:
+            device_addr, offset, addrsize = self._locate(addr)
+            self.i2c.writeto_mem(device_addr, offset, data, addrsize=addrsize)
+            if wait:
+                time.sleep_ms(5)
+            return True
+        except Exception as e:
+            print("Page write error at address " + hex(addr) + ": " + str(e))
+            return False
+
+    def read_block(self, addr, length):
+        # Sequential read, one transaction per 256-byte device block
+        if addr < 0 or addr + length > self.size:
+            return None
+        try:
+            if self.block_bits == 0:
+                device_addr, offset, addrsize = self._locate(addr)
+                return self.i2c.readfrom_mem(device_addr, offset, length, addrsize=addrsize)
+            data = b""
+            while length > 0:
+                n = min(length, 256 - (addr & 0xFF))
+                device_addr, offset, addrsize = self._locate(addr)
+                data += self.i2c.readfrom_mem(device_addr, offset, n, addrsize=addrsize)
+                addr += n
+                length -= n
+            return data
+        except Exception as e:
+            print("Block read error at address " + hex(addr) + ": " + str(e))
+            return None
+
     def write_array(self, start, data):
         try:
             for i in range(0, len(data), self.page_size):
                 chunk = data[i:i + self.page_size]
                 for j, b in enumerate(chunk):
                     self.write_byte(start + i + j, b)
+                memprof.sample()
             return True
         except Exception as e:
             print("Write array error at address " + str(start) + ": " + str(e))
@@ -58,36 +114,71 @@ class EEPROM:
             print("Read array error at address " + str(start) + ": " + str(e))
             return None
 
-    def test(self):
-        print(f"\n--- Testing {self.__class__.__name__} ---")
+    async def test_async(self, verbose=True):
+        # Shared by test() and the test runner's test_eeprom_async; yields
+        # during each write cycle. verbose=False only prints failures and
+        # turns off the per-byte trace
+        trace, self.trace = self.trace, verbose
+        try:
+            return await self._test(verbose)
+        finally:
+            self.trace = trace
+
+    async def _test(self, verbose):
+        def say(msg, failed=False):
+            if verbose or failed:
+                print(msg)
+
+        say(f"\n--- Testing {self.__class__.__name__} ---")
+        passed = False
         max_addr = self.size - 1
-        print(f"\nTesting highest valid address: {hex(max_addr)}")
-        if self.write_byte(max_addr, 0xAA):
-            print("Write to max address succeeded.")
+        say(f"\nTesting highest valid address: {hex(max_addr)}")
+        max_ok = False
+        if self.write_byte(max_addr, 0xAA, wait=False):
+            await asyncio.sleep_ms(5)
+            say("Write to max address succeeded.")
             val = self.read_byte(max_addr)
-            if val == 0xAA:
-                print("Read matches written value: 0xAA")
-            else:
-                print("Mismatch: read " + str(val))
+            recorded = results.record(results.EEPROM, 0, 0xAA, -1 if val is None else val)
+            max_ok = val == 0xAA
+            if not recorded and max_ok:
+                say("Read matches written value: 0xAA")
+            elif not recorded:
+                say("Mismatch: read " + str(val), True)
         else:
-            print("Write to max address failed.")
+            say("Write to max address failed.", True)
 
         test_len = 100 if self.size < 2048 else 200
         start = self.size // 2
         test_data = bytes([i % 256 for i in range(test_len)])
 
-        print(f"\nTesting write/read of {test_len} bytes at address {hex(start)}")
+        say(f"\nTesting write/read of {test_len} bytes at address {hex(start)}")
         t0 = time.ticks_ms()
-        if self.write_array(start, test_data):
+        written = True
+        for i, b in enumerate(test_data):
+            if not self.write_byte(start + i, b, wait=False):
+                written = False
+                break
+            await asyncio.sleep_ms(5)
+            if (i + 1) % self.page_size == 0:
+                memprof.sample()
+        if written:
             result = self.read_array(start, test_len)
-            if result == test_data:
-                print("Data matches. Test passed.")
-            else:
-                print("Data mismatch.")
+            recorded = results.record(results.EEPROM, 1, results.crc16(test_data),
+                                      results.crc16(result) if result else -1,
+                                      time.ticks_diff(time.ticks_ms(), t0) * 1000)
+            passed = max_ok and result == test_data
+            if not recorded and result == test_data:
+                say("Data matches. Test passed.")
+            elif not recorded:
+                say("Data mismatch.", True)
         else:
-            print("Write failed.")
+            say("Write failed.", True)
         t1 = time.ticks_ms()
-        print("Test duration: " + str(time.ticks_diff(t1, t0)) + " ms")
+        say("Test duration: " + str(time.ticks_diff(t1, t0)) + " ms")
+        return passed
+
+    def test(self):
+        return asyncio.run(self.test_async())
 
 # EEPROM subclasses
 class M24C08(EEPROM):
@@ -106,34 +197,15 @@ class AT24C64(EEPROM):
     def __init__(self, i2c):
         super().__init__(i2c, address=0x50, size=8192, page_size=32, block_bits=0)
 
-def check_board():
-    platform = sys.platform
-    if platform == "esp32":
-        print("ESP32 board detected.")
-        print("Select ESP32 board type:")
-        print("1. NANO (SDA=11, SCL=12, freq=400kHz)")
-        print("2. NON_NANO (SDA=4, SCL=5, freq=400kHz)")
-        while True:
-            choice = input("Enter a number (1-2): ").strip()
-            if choice == "1":
-                return I2C(0, sda=Pin(11), scl=Pin(12), freq=400000)
-            elif choice == "2":
-                return I2C(0, sda=Pin(4), scl=Pin(5), freq=400000)
-            else:
-                print("Invalid choice. Try again.")
-    elif platform == "rp2":
-        print("RP2040 board detected.")
-        return I2C(0, sda=Pin(20), scl=Pin(21), freq=400000)
-    else:
-        print("Unsupported platform: " + platform)
-        sys.exit(1)
+async def test_eeprom_async(board):
+    return await board.eeprom.test_async(verbose=False)
 
-def scan_i2c(i2c):
-    print("Scanning I2C bus for devices...")
-    devices = i2c.scan()
+def scan_i2c(board):
+    print("Probing I2C bus for devices...")
+    devices = i2c_probe.find_devices(board, "eeprom_i2c")
     if devices:
-        for device in devices:
-            print(" - Address: " + hex(device))
+        for device in sorted(devices):
+            print(" - Address: " + hex(device) + " (" + devices[device] + ")")
     else:
         print("No I2C devices found.")
 
@@ -157,7 +229,16 @@ def select_eeprom(i2c):
             print("Invalid choice. Try again.")
 
 # ---- MAIN ----
-i2c = check_board()
-scan_i2c(i2c)
-eeprom = select_eeprom(i2c)
-eeprom.test()
+if __name__ == "__main__":
+    board = boards.get_board()
+    if board is None:
+        sys.exit(1)
+    i2c = board.eeprom_i2c
+    scan_i2c(board)
+    eeprom = select_eeprom(i2c) if SELECT_EEPROM else board.eeprom
+    prof = memprof.Profiler()
+    with prof.phase("eeprom"):
+        eeprom.test()
+    prof.report()
+    prof.check()
+
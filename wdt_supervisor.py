@@ -0,0 +1,115 @@
+"""Cooperative task-health watchdog supervisor.
+
+Critical tasks (asyncio coroutines or timer callbacks) register with a
+deadline and check in as they make progress. A single low-priority feeder
+feeds machine.WDT only while every check-in is fresh; once any task misses
+its deadline the feeder stops feeding for good and lets the WDT reset the
+board.
+"""
+from machine import WDT, Timer
+from array import array
+import micropython
+import asyncio
+import time
+import sys
+
+# ESP32 only has hardware timers; rp2 only has the virtual one (-1)
+DEFAULT_TIMER_ID = 0 if sys.platform == "esp32" else -1
+
+
+class TaskSupervisor:
+    """Feed a machine.WDT only while all registered tasks are alive."""
+
+    def __init__(self, timeout_ms=5000, max_tasks=8):
+        self.timeout_ms = timeout_ms
+        self.wdt = None
+        self.timer = None
+        self.names = []
+        self.deadlines = array('i', [0] * max_tasks)
+        self.last_checkin = array('i', [0] * max_tasks)
+        self.starving = False
+        # Called once with the stale slot when the supervisor starts starving
+        self.on_starve = None
+
+    def register(self, name, deadline_ms):
+        """Register a task and return the slot it must pass to checkin()."""
+        slot = len(self.names)
+        if slot >= len(self.deadlines):
+            raise ValueError("Too many supervised tasks")
+        self.names.append(name)
+        self.deadlines[slot] = deadline_ms
+        self.last_checkin[slot] = time.ticks_ms()
+        return slot
+
+    def checkin(self, slot):
+        """Mark a task alive. A single array store, safe from IRQ context."""
+        self.last_checkin[slot] = time.ticks_ms()
+
+    def stale(self):
+        """Return the first task slot past its deadline, or -1."""
+        now = time.ticks_ms()
+        for slot in range(len(self.names)):
+            if time.ticks_diff(now, self.last_checkin[slot]) > self.deadlines[slot]:
+                return slot
+        return -1
+
+    def start(self):
+        """Arm the WDT. It cannot be disabled again until the next reset."""
+        now = time.ticks_ms()
+        for slot in range(len(self.names)):
+            self.last_checkin[slot] = now
+        self.wdt = WDT(timeout=self.timeout_ms)
+
+    def poll(self):
+        """Feed the WDT once if every task is fresh. Returns the stale slot or -1."""
+        if self.starving:
+            return -1
+        slot = self.stale()
+        if slot < 0:
+            self.wdt.feed()
+            return -1
+        self.starving = True
+        print("Task '{}' missed its deadline, starving watchdog".format(self.names[slot]))
+        if self.on_starve:
+            self.on_starve(slot)
+        return slot
+
+    def feed_period_ms(self):
+        # Poll several times per WDT timeout so a healthy system never
+        # comes close to expiring it
+        return max(self.timeout_ms // 4, 1)
+
+    async def run(self, period_ms=None):
+        """Feeder coroutine: start it as a task next to the supervised ones."""
+        if self.wdt is None:
+            self.start()
+        period_ms = period_ms or self.feed_period_ms()
+        if timer_id is None:
+            timer_id = DEFAULT_TIMER_ID
+        while True:
+            self.poll()
+            await asyncio.sleep_ms(period_ms)
+
+    def _scheduled_poll(self, _):
+        self.poll()
+
+    def _timer_callback(self, timer):
+        # May run as a hard IRQ (port dependent), where poll() can't
+        # allocate or do I2C, so only queue it for the main context
+        try:
+            micropython.schedule(self._poll_ref, 0)
+        except RuntimeError:
+            # Schedule queue full; the next tick feeds instead
+            pass
+
+    def start_timer(self, timer_id=None, period_ms=None):
+        """Feeder on a periodic machine.Timer for firmware without asyncio."""
+        if self.wdt is None:
+            self.start()
+        period_ms = period_ms or self.feed_period_ms()
+        # Bound methods allocate, so create them here rather than in the IRQ
+        self._poll_ref = self._scheduled_poll
+        self.timer = Timer(timer_id)
+        self.timer.init(mode=Timer.PERIODIC, period=period_ms,
+                        callback=self._timer_callback)
+        return self.timer